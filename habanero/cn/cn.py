@@ -16,7 +16,8 @@ def content_negotiation(ids = None, format = "bibtex", style = 'apa',
         you'll get a `(500) Internal Server Error`
     :param locale: [str] Language locale. See `locale.locale_alias`
     :param url: [str] Base URL for the content negotiation request. Default: `https://doi.org`
-    :param kwargs: any additional arguments will be passed on to `requests.get`
+    :param kwargs: any additional arguments will be passed on to `requests.get`,
+        except `session`, a `requests.Session` to make the requests with
 
     :return: string, which can be parsed to various formats depending on what
         format you request (e.g., JSON vs. XML vs. bibtex)
@@ -5,7 +5,7 @@ from .habanero_utils import switch_classes,make_ua
 from .cn_formats import *
 
 def CNRequest(url, ids = None, format = None, style = None,
-        locale = None, **kwargs):
+        locale = None, session = None, **kwargs):
 
   should_split = False
   try:
@@ -23,18 +23,20 @@ def CNRequest(url, ids = None, format = None, style = None,
     ids = [ids]
 
   if(len(ids) == 1):
-    return make_request(url, ids[0], format, style, locale, **kwargs)
+    return make_request(url, ids[0], format, style, locale,
+      session = session, **kwargs)
   else:
     coll = []
     for i in range(len(ids)):
-      tt = make_request(url, ids[i], format, style, locale, **kwargs)
+      tt = make_request(url, ids[i], format, style, locale,
+        session = session, **kwargs)
       coll.append(tt)
 
     if len(coll) == 1:
       coll = coll[0]
     return coll
 
-def make_request(url, ids, format, style, locale, **kwargs):
+def make_request(url, ids, format, style, locale, session = None, **kwargs):
   type = cn_format_headers[format]
 
   if format == "citeproc-json":
@@ -46,7 +48,8 @@ def make_request(url, ids, format, style, locale, **kwargs):
 
   htype = {'Accept': type}
   head = dict(make_ua(), **htype)
-  response = requests.get(url, headers = head, allow_redirects = True, **kwargs)
+  http = session or requests
+  response = http.get(url, headers = head, allow_redirects = True, **kwargs)
 
   # Raise an HTTPError if the status code of the response is 4XX or 5XX
   response.raise_for_status()
@@ -3,13 +3,14 @@ from xml.dom import minidom
 from ..habanero_utils import make_ua
 
 def citation_count(doi, url = "http://www.crossref.org/openurl/",
-    key = "cboettig@ropensci.org", **kwargs):
+    key = "cboettig@ropensci.org", session = None, **kwargs):
     '''
     Get a citation count with a DOI
 
     :param doi: [String] DOI, digital object identifier
     :param url: [String] the API url for the function (should be left to default)
     :param keyc: [String] your API key
+    :param session: [Session] a `requests.Session` to make the request with
 
     See http://labs.crossref.org/openurl/ for more info on this Crossref API service.
 
@@ -24,7 +25,8 @@ def citation_count(doi, url = "http://www.crossref.org/openurl/",
     '''
     args = {"id": "doi:" + doi, "pid": key, "noredirect": True}
     args = dict((k, v) for k, v in args.items() if v)
-    res = requests.get(url, params = args, headers = make_ua(), **kwargs)
+    http = session or requests
+    res = http.get(url, params = args, headers = make_ua(), **kwargs)
     xmldoc = minidom.parseString(res.content)
     val = xmldoc.getElementsByTagName('query')[0].attributes['fl_count'].value
     return int(str(val))
@@ -2,6 +2,7 @@ import sys
 import requests
 from ..request import request
 from ..request_class import Request
+from ..harvest import harvest, harvest_shards, Throttle
 from ..habanero_utils import sub_str,check_kwargs
 from .filters import filter_details
 
@@ -15,7 +16,7 @@ class Crossref(object):
 
     **Includes methods matching Crossref API routes**
 
-    * /works - :func:`~habanero.Crossref.works`
+    * /works - :func:`~habanero.Crossref.works`, :func:`~habanero.Crossref.harvest`
     * /members - :func:`~habanero.Crossref.members`
     * /prefixes - :func:`~habanero.Crossref.prefixes`
     * /funders - :func:`~habanero.Crossref.funders`
@@ -58,6 +59,9 @@ class Crossref(object):
         cr = Crossref()
         # set a different base url
         Crossref(base_url = "http://some.other.url")
+        # send requests through a requests.Session, or anything with the
+        # same get method
+        Crossref(session = requests.Session())
         # set an api key
         Crossref(api_key = "123456")
         # set a mailto address
@@ -159,11 +163,12 @@ class Crossref(object):
     |
     '''
     def __init__(self, base_url = "https://api.crossref.org",
-        api_key = None, mailto = None):
+        api_key = None, mailto = None, session = None):
 
         self.base_url = base_url
         self.api_key = api_key
         self.mailto = mailto
+        self.session = session
 
     def __repr__(self):
       return """< %s \nURL: %s\nKEY: %s\nMAILTO: %s\n>""" % (type(self).__name__,
@@ -172,7 +177,8 @@ class Crossref(object):
     def works(self, ids = None, query = None, filter = None, offset = None,
               limit = None, sample = None, sort = None,
               order = None, facet = None, select = None, cursor = None,
-              cursor_max = 5000, **kwargs):
+              cursor_max = 5000, workers = None, warn = False,
+              stream = False, **kwargs):
         '''
         Search Crossref works
 
@@ -210,6 +216,15 @@ class Crossref(object):
             deep paging can result in continuous requests until all are retrieved, use this
             parameter to set a maximum number of records. Of course, if there are less records
             found than this value, you will get only those found.
+        :param workers: [Fixnum] Number of ids to fetch at once. Only used when ids param used.
+            Default: None, one at a time. Keep this small, e.g. 5, to stay within the
+            RateLimits_ of the polite pool. Results are in the same order as ids either way.
+        :param warn: [Boolean] Warn instead of raising an error when fetching one of the ids
+            fails, and give back None for that id. Only used when ids param used. Default: False
+        :param stream: [Boolean] Give back a generator of the records, one at a time, instead
+            of a dict for each page. Only the current page is held in memory, so with
+            `cursor = "*"` even very large result sets can be walked through. Not used when
+            ids param used. Default: False
         :param kwargs: additional named arguments passed on to `requests.get`, e.g., field
             queries (see examples and FieldQueries_)
 
@@ -223,6 +238,8 @@ class Crossref(object):
             cr.works(ids = '10.1371/journal.pone.0033693')
             dois = ['10.1371/journal.pone.0033693', ]
             cr.works(ids = dois)
+            # fetch many dois 5 at a time, with None for any that fail
+            cr.works(ids = dois, workers = 5, warn = True)
             x = cr.works(query = "ecology")
             x['status']
             x['message-type']
@@ -276,6 +293,9 @@ class Crossref(object):
             items = [ z['message']['items'] for z in res ]
             items = [ item for sublist in items for item in sublist ]
             [ z['DOI'] for z in items ][0:50]
+            ## or stream the records, holding only one page at a time
+            for item in cr.works(query = "ecology", cursor = "*", cursor_max = 100000, limit = 1000, stream = True):
+                print(item['DOI'])
 
             # field queries
             res = cr.works(query = "ecology", query_author = 'carl boettiger')
@@ -290,11 +310,97 @@ class Crossref(object):
         if ids.__class__.__name__ != 'NoneType':
             return request(self.mailto, self.base_url, "/works/", ids,
                 query, filter, offset, limit, sample, sort,
-                order, facet, select, None, None, None, None, **kwargs)
+                order, facet, select, None, None, None, None, session = self.session,
+                workers = workers, warn = warn, **kwargs)
         else:
-            return Request(self.mailto, self.base_url, "/works/",
+            req = Request(self.mailto, self.base_url, "/works/",
               query, filter, offset, limit, sample, sort,
-              order, facet, select, cursor, cursor_max, None, **kwargs).do_request()
+              order, facet, select, cursor, cursor_max, None, session = self.session, **kwargs)
+            if stream:
+                return req.items()
+            return req.do_request()
+
+    def harvest(self, sink, query = None, filter = None, limit = 1000,
+                sort = None, order = None, select = None, cursor_max = None,
+                checkpoint = None, every = 1, shards = None, workers = 4,
+                rate = None, **kwargs):
+        '''
+        Harvest Crossref works to a file
+
+        Deep pages through every work matching the query and filter, writing
+        them to `sink` as newline delimited JSON without keeping them in
+        memory. Progress is checkpointed, so an interrupted harvest picks up
+        where it left off when run again with the same arguments.
+
+        One cursor only fetches one page at a time. To fetch several at once,
+        pass `shards` along with a date range in `filter`, such as
+        `from_pub_date` and `until_pub_date`, or `from_index_date` and
+        `until_index_date`. The range is split into that many windows, each
+        paged through by its own cursor, and the works merged into `sink`
+        once every window is done. Works without a date of that kind don't
+        fall in any window.
+
+        :param sink: [String] Path of the file to write the works to
+        :param query: [String] A query string
+        :param filter: [Hash] Filter options. See :func:`~habanero.Crossref.works`
+        :param limit: [Fixnum] Number of works to fetch per request. Default: 1000, the most allowed
+        :param sort: [String] Field to sort on. See sorting_ for possible values.
+        :param order: [String] Sort order, one of 'asc' or 'desc'
+        :param select: [String/list(Strings)] Elements of each work to fetch. When sharded,
+            `DOI` is always fetched.
+        :param cursor_max: [Fixnum] Max records to retrieve, in each window if sharded.
+            Default: None, all of them
+        :param checkpoint: [String] Path of the checkpoint file. Default: `sink` with
+            `.checkpoint` added. Remove it to start the harvest over.
+        :param every: [Fixnum] Number of pages to fetch between checkpoints. Default: 1
+        :param shards: [Fixnum] Number of date windows to split the harvest into. Default: None,
+            one cursor over the whole query
+        :param workers: [Fixnum] Number of date windows to harvest at once. Default: 4
+        :param rate: [Fixnum] Most requests to make a second, across all the windows. Keep
+            this within the RateLimits_. Default: None, no limit
+        :param kwargs: additional named arguments passed on to `requests.get`, e.g., field
+            queries (see examples and FieldQueries_)
+
+        :return: the number of works in `sink`
+
+        Usage::
+
+            from habanero import Crossref
+            cr = Crossref(mailto = "foo@bar.com")
+            cr.harvest("ecology.ndjson", query = "ecology", cursor_max = 100000)
+            # after a crash or network error, the same call resumes the harvest
+            cr.harvest("ecology.ndjson", query = "ecology", cursor_max = 100000)
+
+            # fetch ten windows of a year each, four at a time
+            cr.harvest("ecology.ndjson", query = "ecology",
+              filter = {'from_pub_date': '2010', 'until_pub_date': '2019'},
+              shards = 10, workers = 4, rate = 10)
+
+            import json
+            with open("ecology.ndjson") as f:
+                for line in f:
+                    print(json.loads(line)['DOI'])
+        '''
+        session = self.session
+        if rate is not None:
+            session = Throttle(session or requests, rate)
+
+        if shards and select:
+            # the merge needs each work's DOI to drop duplicates
+            if select.__class__ is not list:
+                select = select.split(',')
+            if 'DOI' not in select:
+                select = select + ['DOI']
+
+        def make_request(filter):
+            return Request(self.mailto, self.base_url, "/works/",
+              query, filter, None, limit, None, sort,
+              order, None, select, "*", cursor_max, None, session = session, **kwargs)
+
+        if shards:
+            return harvest_shards(make_request, filter, sink, shards, workers,
+              checkpoint, every)
+        return harvest(make_request(filter), sink, checkpoint, every)
 
     def members(self, ids = None, query = None, filter = None, offset = None,
               limit = None, sample = None, sort = None,
@@ -357,7 +463,7 @@ class Crossref(object):
         '''
         return request(self.mailto, self.base_url, "/members/", ids,
             query, filter, offset, limit, sample, sort,
-            order, facet, select, works, cursor, cursor_max, **kwargs)
+            order, facet, select, works, cursor, cursor_max, session = self.session, **kwargs)
 
     def prefixes(self, ids = None, filter = None, offset = None,
               limit = None, sample = None, sort = None,
@@ -428,7 +534,7 @@ class Crossref(object):
           query = None, filter = filter, offset = offset, limit = limit,
           sample = sample, sort = sort, order = order, facet = facet,
           select = select, works = works, cursor = cursor, cursor_max = cursor_max,
-          **kwargs)
+          session = self.session, **kwargs)
 
     def funders(self, ids = None, query = None, filter = None, offset = None,
               limit = None, sample = None, sort = None,
@@ -494,7 +600,7 @@ class Crossref(object):
         '''
         return request(self.mailto, self.base_url, "/funders/", ids,
           query, filter, offset, limit, sample, sort,
-          order, facet, select, works, cursor, cursor_max, **kwargs)
+          order, facet, select, works, cursor, cursor_max, session = self.session, **kwargs)
 
     def journals(self, ids = None, query = None, filter = None, offset = None,
               limit = None, sample = None, sort = None,
@@ -569,7 +675,7 @@ class Crossref(object):
         '''
         return request(self.mailto, self.base_url, "/journals/", ids,
           query, filter, offset, limit, sample, sort,
-          order, facet, select, works, cursor, cursor_max, **kwargs)
+          order, facet, select, works, cursor, cursor_max, session = self.session, **kwargs)
 
     def types(self, ids = None, query = None, filter = None, offset = None,
               limit = None, sample = None, sort = None,
@@ -623,7 +729,7 @@ class Crossref(object):
         '''
         return request(self.mailto, self.base_url, "/types/", ids,
             query, filter, offset, limit, sample, sort,
-            order, facet, select, works, cursor, cursor_max, **kwargs)
+            order, facet, select, works, cursor, cursor_max, session = self.session, **kwargs)
 
     def licenses(self, query = None, offset = None,
               limit = None, sample = None, sort = None,
@@ -656,7 +762,7 @@ class Crossref(object):
         check_kwargs(["ids", "filter", "works"], kwargs)
         res = request(self.mailto, self.base_url, "/licenses/", None,
             query, None, offset, limit, None, sort,
-            order, facet, None, None, None, None, **kwargs)
+            order, facet, None, None, None, None, session = self.session, **kwargs)
         return res
 
     def registration_agency(self, ids, **kwargs):
@@ -680,7 +786,7 @@ class Crossref(object):
             "order", "facet", "works"], kwargs)
         res = request(self.mailto, self.base_url, "/works/", ids,
             None, None, None, None, None, None,
-            None, None, None, None, None, True, **kwargs)
+            None, None, None, None, None, True, session = self.session, **kwargs)
         if res.__class__ != list:
             k = []
             k.append(res)
@@ -709,7 +815,7 @@ class Crossref(object):
         '''
         res = request(self.mailto, self.base_url, "/works/", None,
             None, None, None, None, sample, None,
-            None, None, True, **kwargs)
+            None, None, True, session = self.session, **kwargs)
         return [ z['DOI'] for z in res['message']['items'] ]
 
     @staticmethod
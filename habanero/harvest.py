@@ -0,0 +1,221 @@
+import json
+import os
+import re
+import threading
+import time
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+def harvest(req, sink, checkpoint = None, every = 1):
+  '''
+  Habanero: write every record found by a deep paging request to a file
+
+  Records are written to `sink` as newline delimited JSON, one page at a
+  time. After every `every` pages the next cursor, the number of records
+  written and the size of `sink` are saved to `checkpoint` (by default
+  `sink` with `.checkpoint` added). If a harvest is interrupted, running it
+  again with the same arguments picks up from the last checkpoint, and
+  drops anything written to `sink` after it.
+
+  Crossref cursors expire after five minutes unused, so a harvest can only
+  be resumed within five minutes of being interrupted.
+
+  :return: the number of records in `sink`
+  '''
+  if checkpoint is None:
+    checkpoint = sink + '.checkpoint'
+
+  state = _read_checkpoint(checkpoint)
+  if state is None:
+    state = {'cursor': req.cursor or '*', 'count': 0, 'size': 0,
+             'done': False}
+  if state['done']:
+    return state['count']
+
+  cursor_max = req.cursor_max
+  req.cursor = state['cursor']
+  if cursor_max is not None:
+    req.cursor_max = cursor_max - state['count']
+
+  mode = 'r+b' if os.path.exists(sink) else 'wb'
+  with open(sink, mode) as f:
+    f.seek(state['size'])
+    f.truncate()
+    pages = 0
+    if req.cursor_max is None or req.cursor_max > 0:
+      for js in req.pages():
+        items = js['message']['items']
+        if cursor_max is not None:
+          items = items[:cursor_max - state['count']]
+        for item in items:
+          f.write(json.dumps(item).encode('utf-8') + b'\n')
+        state['count'] += len(items)
+        state['cursor'] = js['message'].get('next-cursor')
+        pages += 1
+        if pages % every == 0:
+          state['size'] = _sync(f)
+          _write_checkpoint(checkpoint, state)
+    state['size'] = _sync(f)
+
+  state['done'] = True
+  _write_checkpoint(checkpoint, state)
+  return state['count']
+
+def harvest_shards(make_request, filter, sink, shards, workers = 4,
+        checkpoint = None, every = 1):
+  '''
+  Habanero: harvest the windows of a date range in parallel
+
+  The date range of `filter` is split into `shards` disjoint windows by
+  :func:`date_windows`. `make_request` is called with the filter for each
+  window and gives back the deep paging request for it, and up to `workers`
+  windows are harvested at once, each to its own file next to `sink` with
+  its own checkpoint. Once they have all finished they are merged into
+  `sink`, in date order. When the windows are of index dates, works that
+  were reindexed into a second window during the harvest are only kept
+  once, going by their DOI.
+
+  As with :func:`harvest`, running it again with the same arguments after
+  an interruption resumes every window from its last checkpoint.
+
+  :return: the number of records in `sink`
+  '''
+  if checkpoint is None:
+    checkpoint = sink + '.checkpoint'
+
+  state = _read_checkpoint(checkpoint)
+  if state is not None and state['done']:
+    return state['count']
+
+  windows = date_windows(filter, shards)
+  parts = [ '%s.%d' % (sink, i) for i in range(len(windows)) ]
+  # a work reindexed during the harvest can turn up in two index date
+  # windows; other dates don't change, so the windows can't overlap
+  frm, _ = _date_keys(filter)
+  dedupe = re.sub("-", "_", frm) == "from_index_date"
+
+  def run(i):
+    return harvest(make_request(windows[i]), parts[i], None, every)
+
+  with ThreadPoolExecutor(max_workers = workers) as pool:
+    list(pool.map(run, range(len(windows))))
+
+  # only the first copy of a work is kept; works without a DOI can't be
+  # told apart, so they're all kept
+  seen = set()
+  count = 0
+  with open(sink, 'wb') as out:
+    for part in parts:
+      with open(part, 'rb') as f:
+        for line in f:
+          if dedupe:
+            doi = json.loads(line.decode('utf-8')).get('DOI')
+            if doi is not None and doi in seen:
+              continue
+            seen.add(doi)
+          out.write(line)
+          count += 1
+    size = _sync(out)
+
+  _write_checkpoint(checkpoint,
+    {'cursor': None, 'count': count, 'size': size, 'done': True})
+  for part in parts:
+    os.remove(part)
+    os.remove(part + '.checkpoint')
+  return count
+
+def date_windows(filter, shards):
+  '''
+  Habanero: split the date range of a filter into disjoint windows
+
+  `filter` must have a `from_..._date` and `until_..._date` pair, e.g.
+  `from_pub_date` and `until_pub_date` or `from_index_date` and
+  `until_index_date`, with dates as `YYYY`, `YYYY-MM` or `YYYY-MM-DD`. The
+  days from one to the other are split into `shards` runs of whole days, or
+  one per day if there are fewer days than that.
+
+  :return: a copy of `filter` for each window, earliest first
+  '''
+  frm, until = _date_keys(filter)
+  first = _parse_date(filter[frm])
+  last = _parse_date(filter[until], end = True)
+  days = (last - first).days + 1
+  if days < 1:
+    raise ValueError("%s is after %s" % (frm, until))
+  shards = min(shards, days)
+
+  starts = [ first + timedelta(days = days * i // shards) for i in range(shards) ]
+  ends = [ z - timedelta(days = 1) for z in starts[1:] ] + [last]
+  windows = []
+  for start, end in zip(starts, ends):
+    window = dict(filter)
+    window[frm] = start.isoformat()
+    window[until] = end.isoformat()
+    windows.append(window)
+  return windows
+
+def _date_keys(filter):
+  # the from and until keys of the first date pair in filter
+  keys = dict((re.sub("-", "_", k), k) for k in (filter or {}))
+  for k in sorted(keys):
+    m = re.match("from_(.+)_date$", k)
+    if m and "until_%s_date" % m.group(1) in keys:
+      return keys[k], keys["until_%s_date" % m.group(1)]
+  raise ValueError("filter needs a from_..._date and until_..._date to shard")
+
+def _parse_date(x, end = False):
+  parts = [ int(z) for z in str(x).split("-") ]
+  if len(parts) == 3:
+    return date(*parts)
+  if len(parts) == 1:
+    parts.append(12 if end else 1)
+  if not end:
+    return date(parts[0], parts[1], 1)
+  # the day before the first of the next month
+  month = date(parts[0] + parts[1] // 12, parts[1] % 12 + 1, 1)
+  return month - timedelta(days = 1)
+
+class Throttle(object):
+  '''
+  Habanero: spaces out the requests made through a session
+
+  One Throttle can be shared by many threads, and together they make no
+  more than `rate` requests a second.
+  '''
+  def __init__(self, session, rate):
+    self.session = session
+    self.interval = 1.0 / rate
+    self.lock = threading.Lock()
+    self.next = 0
+
+  def __getattr__(self, name):
+    return getattr(self.session, name)
+
+  def get(self, *args, **kwargs):
+    with self.lock:
+      now = time.monotonic()
+      wait = self.next - now
+      self.next = max(now, self.next) + self.interval
+    if wait > 0:
+      time.sleep(wait)
+    return self.session.get(*args, **kwargs)
+
+def _sync(f):
+  f.flush()
+  os.fsync(f.fileno())
+  return f.tell()
+
+def _read_checkpoint(checkpoint):
+  try:
+    with open(checkpoint) as f:
+      return json.load(f)
+  except (IOError, OSError, ValueError):
+    return None
+
+def _write_checkpoint(checkpoint, state):
+  # write a new file and move it over the old one, so a crash part way
+  # through never leaves a half written checkpoint
+  tmp = checkpoint + '.tmp'
+  with open(tmp, 'w') as f:
+    json.dump(state, f)
+  os.replace(tmp, checkpoint)
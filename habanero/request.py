@@ -1,6 +1,8 @@
 import requests
 import json
 import re
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 
 from .filterhandler import filter_handler
 from .habanero_utils import switch_classes,check_json,is_json,parse_json_err,make_ua,filter_dict,rename_query_filters
@@ -10,14 +12,20 @@ from .request_class import Request
 def request(mailto, url, path, ids = None, query = None, filter = None,
         offset = None, limit = None, sample = None, sort = None,
         order = None, facet = None, select = None, works = None,
-        cursor = None, cursor_max = None, agency = False, **kwargs):
+        cursor = None, cursor_max = None, agency = False, session = None,
+        workers = None, warn = False, **kwargs):
 
   url = url + path
+  http = session or requests
 
   if cursor_max.__class__.__name__ != 'NoneType':
     if cursor_max.__class__ != int:
       raise ValueError("cursor_max must be of class int")
 
+  if workers.__class__.__name__ != 'NoneType':
+    if workers.__class__ != int or workers < 1:
+      raise ValueError("workers must be a positive int")
+
   filt = filter_handler(filter)
   if select.__class__ is list:
     select = ','.join(select)
@@ -35,7 +43,7 @@ def request(mailto, url, path, ids = None, query = None, filter = None,
   if(ids.__class__.__name__ == 'NoneType'):
     url = url.strip("/")
     try:
-      r = requests.get(url, params = payload, headers = make_ua(mailto))
+      r = http.get(url, params = payload, headers = make_ua(mailto))
       r.raise_for_status()
     except requests.exceptions.HTTPError:
       if is_json(r):
@@ -52,35 +60,50 @@ def request(mailto, url, path, ids = None, query = None, filter = None,
       ids = ids.split()
     if(ids.__class__.__name__ == "int"):
       ids = [ids]
-    coll = []
-    for i in range(len(ids)):
+
+    def fetch_id(id):
       if works:
-        res = Request(mailto, url, str(ids[i]) + "/works",
+        return Request(mailto, url, str(id) + "/works",
           query, filter, offset, limit, sample, sort,
-          order, facet, select, cursor, cursor_max, **kwargs).do_request()
-        coll.append(res)
+          order, facet, select, cursor, cursor_max,
+          session = session, **kwargs).do_request()
+
+      if agency:
+        endpt = url + str(id) + "/agency"
       else:
-        if agency:
-          endpt = url + str(ids[i]) + "/agency"
-        else:
-          endpt = url + str(ids[i])
+        endpt = url + str(id)
 
-        endpt = endpt.strip("/")
+      endpt = endpt.strip("/")
 
-        try:
-          r = requests.get(endpt, params = payload, headers = make_ua(mailto))
+      try:
+        r = http.get(endpt, params = payload, headers = make_ua(mailto))
+        r.raise_for_status()
+      except requests.exceptions.HTTPError:
+        if is_json(r):
+          raise RequestError(r.status_code, parse_json_err(r))
+        else:
           r.raise_for_status()
-        except requests.exceptions.HTTPError:
-          if is_json(r):
-            raise RequestError(r.status_code, parse_json_err(r))
-          else:
-            r.raise_for_status()
-        except requests.exceptions.RequestException as e:
+      except requests.exceptions.RequestException as e:
+        raise e
+      check_json(r)
+      #tt_out = switch_classes(js, path, works)
+      return r.json()
+
+    def fetch(id):
+      try:
+        return fetch_id(id)
+      except (RequestError, requests.exceptions.RequestException) as e:
+        if not warn:
           raise e
-        check_json(r)
-        js = r.json()
-        #tt_out = switch_classes(js, path, works)
-        coll.append(js)
+        warnings.warn("%s: %s" % (id, e))
+        return None
+
+    # fetch a few ids at once, keeping results in the order of ids
+    if workers and workers > 1 and len(ids) > 1:
+      with ThreadPoolExecutor(max_workers = min(workers, len(ids))) as pool:
+        coll = list(pool.map(fetch, ids))
+    else:
+      coll = [ fetch(z) for z in ids ]
 
     if len(coll) == 1:
       coll = coll[0]
@@ -15,7 +15,7 @@ class Request(object):
   def __init__(self, mailto, url, path, query = None, filter = None,
         offset = None, limit = None, sample = None, sort = None,
         order = None, facet = None, select = None, cursor = None,
-        cursor_max = None, agency = False, **kwargs):
+        cursor_max = None, agency = False, session = None, **kwargs):
     self.mailto = mailto
     self.url = url
     self.path = path
@@ -31,13 +31,14 @@ class Request(object):
     self.cursor = cursor
     self.cursor_max = cursor_max
     self.agency = agency
+    self.session = session
     self.kwargs = kwargs
 
   def _url(self):
     tmpurl = self.url + self.path
     return tmpurl.strip("/")
 
-  def do_request(self):
+  def _payload(self):
     filt = filter_handler(self.filter)
     if self.select.__class__ is list:
       self.select = ','.join(self.select)
@@ -54,7 +55,10 @@ class Request(object):
     payload.update(filter_dict(self.kwargs))
     # rename query filters
     payload = rename_query_filters(payload)
+    return payload
 
+  def do_request(self):
+    payload = self._payload()
     js = self._req(payload = payload)
     cu = js['message'].get('next-cursor')
     max_avail = js['message']['total-results']
@@ -70,14 +74,49 @@ class Request(object):
         out = self._req(payload = payload)
         cu = out['message'].get('next-cursor')
         res.append(out)
-        total = sum([ len(z['message']['items']) for z in res ])
+        total += len(out['message']['items'])
       return res
     else:
       return js
 
+  def pages(self):
+    '''
+    Generator of the response for each page, following the cursor
+
+    Only the current page is held on to, so this runs in constant memory
+    however many pages there are. Stops once cursor_max records have been
+    fetched, or there are none left.
+    '''
+    payload = self._payload()
+    total = 0
+    while True:
+      js = self._req(payload = payload)
+      items = js['message']['items']
+      total += len(items)
+      yield js
+      cu = js['message'].get('next-cursor')
+      if(cu.__class__.__name__ == 'NoneType' or not items
+         or total >= js['message']['total-results']
+         or (self.cursor_max is not None and total >= self.cursor_max)):
+        return
+      payload['cursor'] = cu
+
+  def items(self):
+    '''
+    Generator of the records on each page, no more than cursor_max of them
+    '''
+    count = 0
+    for js in self.pages():
+      for item in js['message']['items']:
+        if self.cursor_max is not None and count >= self.cursor_max:
+          return
+        count += 1
+        yield item
+
   def _req(self, payload):
     try:
-      r = requests.get(self._url(), params = payload, headers = make_ua(self.mailto))
+      http = self.session or requests
+      r = http.get(self._url(), params = payload, headers = make_ua(self.mailto))
       r.raise_for_status()
     except requests.exceptions.HTTPError:
       try:
@@ -86,6 +125,6 @@ class Request(object):
       except:
         r.raise_for_status()
     except requests.exceptions.RequestException as e:
-      print(e)
+      raise e
     check_json(r)
     return r.json()
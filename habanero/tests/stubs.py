@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Stand-ins for a requests session talking to the Crossref API
+'''
+
+import requests
+
+
+def make_works(n, year = 2010):
+  return [ {'DOI': '10.1/%d' % i, 'title': ['t%d' % i],
+            'date': '%d-%02d-01' % (year + i % 2, i % 12 + 1)} for i in range(n) ]
+
+
+class StubResponse(object):
+  def __init__(self, body = None, status_code = 200, content_type = 'application/json'):
+    self.status_code = status_code
+    self.body = body
+    self.headers = {'Content-Type': content_type}
+    self.text = str(body)
+
+  def json(self):
+    if not isinstance(self.body, dict):
+      raise ValueError("not json")
+    return self.body
+
+  def raise_for_status(self):
+    if self.status_code >= 400:
+      raise requests.exceptions.HTTPError(str(self.status_code))
+
+
+class StubSession(object):
+  '''
+  Answers every id with a work, and deep pages through works
+
+  `failures` maps an id to the response, or the exception, to give back
+  for it instead. Requests without an id page through `works`, using the
+  offset into it as the cursor, and honour select and date filters. Each
+  work has a 'date', which from_/until_ date filters of any kind are
+  compared with. The request numbered `fail_at` raises a connection error.
+  '''
+  def __init__(self, failures = None, works = None, fail_at = None):
+    self.failures = failures or {}
+    self.works = works or []
+    self.fail_at = fail_at
+    self.urls = []
+
+  def get(self, url, params = None, headers = None):
+    self.urls.append(url)
+    if len(self.urls) == self.fail_at:
+      raise requests.exceptions.ConnectionError('dropped')
+    if '/works/' not in url:
+      return self.page(params)
+    id = url.split('/works/')[1].replace('/works', '')
+    failure = self.failures.get(id)
+    if isinstance(failure, Exception):
+      raise failure
+    if failure is not None:
+      return failure
+    return StubResponse({'status': 'ok',
+      'message': {'DOI': id, 'total-results': 1, 'items': []}})
+
+  def page(self, params):
+    filters = dict(z.split(':', 1) for z in (params.get('filter') or '').split(',') if z)
+    works = [ w for w in self.works
+      if all(w['date'] >= v for k, v in filters.items() if k.startswith('from-'))
+      and all(w['date'] <= v for k, v in filters.items() if k.startswith('until-')) ]
+    if 'select' in params:
+      fields = params['select'].split(',')
+      works = [ dict((k, v) for k, v in w.items() if k in fields) for w in works ]
+    rows = int(params['rows'])
+    start = 0 if params['cursor'] == '*' else int(params['cursor'])
+    return StubResponse({'status': 'ok', 'message': {
+      'total-results': len(works),
+      'items': works[start:start + rows],
+      'next-cursor': str(start + rows)}})
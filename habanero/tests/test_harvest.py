@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+
+from habanero import Crossref
+
+from stubs import StubSession, make_works
+
+
+class TestHarvest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.sink = os.path.join(self.dir, 'works.ndjson')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self):
+        with open(self.sink) as f:
+            return [ json.loads(line) for line in f ]
+
+    def test_resumes_from_checkpoint(self):
+        works = make_works(23)
+        session = StubSession(works = works, fail_at = 4)
+        cr = Crossref(session = session)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            cr.harvest(self.sink, limit = 5)
+        # a line cut short by the crash is dropped on resume
+        with open(self.sink, 'ab') as f:
+            f.write(b'{"DOI": "10.1/')
+        self.assertEqual(cr.harvest(self.sink, limit = 5), 23)
+        self.assertEqual([ w['DOI'] for w in self.read() ], [ w['DOI'] for w in works ])
+        # pages before the checkpoint weren't fetched again
+        self.assertEqual(len(session.urls), 3 + 1 + 3)
+        calls = len(session.urls)
+        self.assertEqual(cr.harvest(self.sink, limit = 5), 23)
+        self.assertEqual(len(session.urls), calls)
+
+    def test_checkpoint_every_few_pages(self):
+        session = StubSession(works = make_works(23), fail_at = 5)
+        cr = Crossref(session = session)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            cr.harvest(self.sink, limit = 5, every = 3)
+        with open(self.sink + '.checkpoint') as f:
+            self.assertEqual(json.load(f)['count'], 15)
+        self.assertEqual(cr.harvest(self.sink, limit = 5, every = 3), 23)
+        self.assertEqual(len(self.read()), 23)
+
+    def test_cursor_max(self):
+        cr = Crossref(session = StubSession(works = make_works(23)))
+        self.assertEqual(cr.harvest(self.sink, limit = 5, cursor_max = 12), 12)
+        self.assertEqual(len(self.read()), 12)
+
+    def test_cursor_max_across_resume(self):
+        session = StubSession(works = make_works(23), fail_at = 3)
+        cr = Crossref(session = session)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            cr.harvest(self.sink, limit = 5, cursor_max = 12)
+        self.assertEqual(cr.harvest(self.sink, limit = 5, cursor_max = 12), 12)
+        self.assertEqual([ w['DOI'] for w in self.read() ],
+          [ '10.1/%d' % i for i in range(12) ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+
+from habanero import Crossref
+from habanero.harvest import date_windows, _parse_date
+
+from stubs import StubSession, make_works
+
+
+class TestDates(unittest.TestCase):
+
+    def test_parse_date(self):
+        self.assertEqual(_parse_date('2010'), date(2010, 1, 1))
+        self.assertEqual(_parse_date('2010', end = True), date(2010, 12, 31))
+        self.assertEqual(_parse_date('2012-02', end = True), date(2012, 2, 29))
+        self.assertEqual(_parse_date('2010-12', end = True), date(2010, 12, 31))
+        self.assertEqual(_parse_date('2010-12'), date(2010, 12, 1))
+        self.assertEqual(_parse_date('2010-03-04', end = True), date(2010, 3, 4))
+
+    def test_windows_are_disjoint_and_cover_range(self):
+        filt = {'from_pub_date': '2010', 'until_pub_date': '2011', 'type': 'journal-article'}
+        windows = date_windows(filt, 3)
+        self.assertEqual(len(windows), 3)
+        self.assertEqual(windows[0]['from_pub_date'], '2010-01-01')
+        self.assertEqual(windows[-1]['until_pub_date'], '2011-12-31')
+        for a, b in zip(windows, windows[1:]):
+            gap = date(*map(int, b['from_pub_date'].split('-'))) - \
+              date(*map(int, a['until_pub_date'].split('-')))
+            self.assertEqual(gap.days, 1)
+        self.assertTrue(all(w['type'] == 'journal-article' for w in windows))
+        self.assertEqual(filt['from_pub_date'], '2010')
+
+    def test_windows_with_hyphenated_keys(self):
+        windows = date_windows({'from-index-date': '2020-01-01', 'until-index-date': '2020-01-02'}, 5)
+        self.assertEqual([ (w['from-index-date'], w['until-index-date']) for w in windows ],
+          [('2020-01-01', '2020-01-01'), ('2020-01-02', '2020-01-02')])
+
+    def test_windows_need_a_date_range(self):
+        with self.assertRaises(ValueError):
+            date_windows({'from_pub_date': '2010'}, 2)
+        with self.assertRaises(ValueError):
+            date_windows(None, 2)
+        with self.assertRaises(ValueError):
+            date_windows({'from_pub_date': '2011', 'until_pub_date': '2010'}, 2)
+
+
+class TestHarvestShards(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.sink = os.path.join(self.dir, 'works.ndjson')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self):
+        with open(self.sink) as f:
+            return [ json.loads(line) for line in f ]
+
+    def test_sharded_keeps_every_work(self):
+        works = make_works(8)
+        cr = Crossref(session = StubSession(works = works))
+        n = cr.harvest(self.sink, filter = {'from_pub_date': '2010', 'until_pub_date': '2011'},
+          limit = 2, select = ['title'], shards = 2)
+        self.assertEqual(n, 8)
+        got = self.read()
+        self.assertEqual(sorted(w['DOI'] for w in got), sorted(w['DOI'] for w in works))
+        self.assertEqual(os.listdir(self.dir), ['works.ndjson', 'works.ndjson.checkpoint'])
+
+    def test_sharded_keeps_works_without_doi(self):
+        works = [ dict(w, DOI = None) for w in make_works(6) ]
+        cr = Crossref(session = StubSession(works = works))
+        n = cr.harvest(self.sink, filter = {'from_index_date': '2010', 'until_index_date': '2011'},
+          limit = 2, shards = 3)
+        self.assertEqual(n, 6)
+
+    def test_sharded_drops_reindexed_duplicates(self):
+        works = make_works(6)
+        session = StubSession(works = works)
+        get = session.get
+        def get_with_moved_work(url, params = None, headers = None):
+            # the first work was reindexed into the last window part way through
+            r = get(url, params, headers)
+            if params['filter'].endswith('2011-12-31') and params['cursor'] == '*':
+                r.body['message']['items'].append(dict(works[0]))
+            return r
+        session.get = get_with_moved_work
+        cr = Crossref(session = session)
+        n = cr.harvest(self.sink, filter = {'from_index_date': '2010', 'until_index_date': '2011'},
+          limit = 10, shards = 2)
+        self.assertEqual(n, 6)
+        self.assertEqual(sorted(w['DOI'] for w in self.read()), sorted(w['DOI'] for w in works))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
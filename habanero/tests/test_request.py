@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import warnings
+
+import requests
+
+from habanero import RequestError
+from habanero.request import request
+
+from stubs import StubResponse, StubSession
+
+
+def call(session, ids, **kwargs):
+    return request(None, 'https://api.crossref.org', '/works/', ids,
+      session = session, **kwargs)
+
+
+class TestRequestIds(unittest.TestCase):
+
+    def test_workers_keep_order(self):
+        ids = ['10.1/%d' % i for i in range(20)]
+        res = call(StubSession(), ids, workers = 4)
+        self.assertEqual([z['message']['DOI'] for z in res], ids)
+
+    def test_workers_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            call(StubSession(), ['10.1/a'], workers = 0)
+
+    def test_error_aborts_without_warn(self):
+        session = StubSession({'10.1/b': StubResponse('Resource not found.', 404, 'text/plain')})
+        with self.assertRaises(requests.exceptions.HTTPError):
+            call(session, ['10.1/a', '10.1/b'], workers = 2)
+
+    def test_warn_gives_none_for_failures(self):
+        session = StubSession({
+          '10.1/b': StubResponse('Resource not found.', 404, 'text/plain'),
+          '10.1/c': StubResponse('<html>', 200, 'text/html'),
+          '10.1/d': requests.exceptions.ConnectionError('refused'),
+        })
+        ids = ['10.1/a', '10.1/b', '10.1/c', '10.1/d', '10.1/e']
+        with warnings.catch_warnings(record = True) as caught:
+            warnings.simplefilter('always')
+            res = call(session, ids, workers = 3, warn = True)
+        self.assertEqual([z and z['message']['DOI'] for z in res],
+          ['10.1/a', None, None, None, '10.1/e'])
+        self.assertEqual(sorted(str(w.message).split(':')[0] for w in caught),
+          ['10.1/b', '10.1/c', '10.1/d'])
+
+    def test_warn_covers_works_routes(self):
+        session = StubSession({'10.1/b': requests.exceptions.ConnectionError('refused')})
+        with warnings.catch_warnings(record = True) as caught:
+            warnings.simplefilter('always')
+            res = request(None, 'https://api.crossref.org', '/works/',
+              ['10.1/a', '10.1/b'], works = True, session = session, warn = True)
+        self.assertEqual(res[1], None)
+        self.assertEqual(res[0]['message']['DOI'], '10.1/a')
+        self.assertEqual(len(caught), 1)
+
+    def test_non_json_response_raises_request_error(self):
+        session = StubSession({'10.1/a': StubResponse('<html>', 200, 'text/html')})
+        with self.assertRaises(RequestError):
+            call(session, '10.1/a')
+
+
+if __name__ == '__main__':
+    unittest.main()
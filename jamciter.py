@@ -9,9 +9,20 @@ import os.path
 import string
 import re
 import unicodedata
-from collections import defaultdict
+import bisect
+import heapq
+import math
+import json
+import threading
+import functools
+import hashlib
+import html
+import time
+import concurrent.futures
+import importlib.util
+from collections import defaultdict, OrderedDict, Counter
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 from imp import reload
-import dateutil.parser
 
 # ST3 loads each package as a module, so it needs an extra prefix
 
@@ -32,26 +43,36 @@ from bibtexparser.customization import convert_to_unicode  # noqa: E402
 from bibtexparser.bparser import BibTexParser  # noqa: E402
 from bibtexparser.bwriter import to_bibtex  # noqa: E402
 
-try:
-    from pymed import PubMed
-    from pymed.book import PubMedBookArticle
-    from pymed.article import  PubMedArticle
-    PUBMED_AVAILABLE = True
-except Exception:
-    PUBMED_AVAILABLE = False
+
+# The backends for remote searches are only imported once they're first
+# used, as importing them and requests takes most of the plugin's load time
+def modules_available(*names):
+    try:
+        return all(
+            importlib.util.find_spec(name) is not None
+            for name in names
+        )
+    except (ImportError, ValueError):
+        return False
+
+
+PUBMED_AVAILABLE = modules_available('pymed', 'requests', 'dateutil')
+HABANERO_AVAILABLE = modules_available('habanero', 'requests', 'dateutil')
+CHEMRXIV_AVAILABLE = modules_available('requests', 'dateutil')
 
 try:
-    from habanero import Crossref
-    HABANERO_AVAILABLE = True
+    import sqlite3
 except Exception:
-    HABANERO_AVAILABLE = False
+    sqlite3 = None
 
 try:
-    import requests
-    import json
-    CHEMRXIV_AVAILABLE = True
+    # Not every SQLite build has FTS5 compiled in
+    _conn = sqlite3.connect(':memory:')
+    _conn.execute('CREATE VIRTUAL TABLE fts5_check USING fts5(x)')
+    _conn.close()
+    SQLITE_AVAILABLE = True
 except Exception:
-    CHEMRXIV_AVAILABLE = False
+    SQLITE_AVAILABLE = False
 
 # settings cache globals
 BIBFILE_PATH = None
@@ -66,6 +87,8 @@ EXCLUDE = None
 
 SEARCH_COMPLETIONS = None
 CITATION_RE = None
+COMPLETIONS_LIMIT = None
+LIBRARY_SEARCH_LIMIT = None
 
 CROSSREF_MAILTO = None
 OUTPUT_BIBFILE_PATH = None
@@ -73,42 +96,231 @@ CROSSREF_LIMIT = None
 PUBMED_LIMIT = None
 CROSSREF_DATE_FIELD = None
 CHEMRXIV_TOKEN = None
+LIBRARY_BACKEND = None
+LIBRARY_CACHE_SIZE = None
+SEARCH_TIMEOUT = None
+LIVE_SEARCH_DELAY = None
+HTTP_CACHE_SIZE = None
 
-# Internal Cache globals
-_PAPERS = {}
-_YAMLBIB_PATH = None
-_LST_MOD_TIME = {}
-_DOCUMENTS = []
-_MENU = None
-_CITEKEYS = None
+# Settings are resolved once per window/project and cached by window_key
+# until invalidated; the settings globals hold those of _SETTINGS_WINDOW
+_WINDOW_SETTINGS = {}
+_SETTINGS_WINDOW = None
 
+# Internal Cache globals
+# Paper of each view by view id, least recently used first
+_PAPERS = OrderedDict()
+_PAPERS_SIZE = 64
+_YAMLBIB_PATHS = []
+# Registry of loaded libraries by library_key, least recently used first
+_LIBRARIES = OrderedDict()
+# Key of the library each window is using
+_WINDOW_LIBRARIES = {}
+# Parsed entries of each file by (path, identity), shared between libraries
+_PARSED_FILES = {}
+# Worker threads that read and parse bibliographies, created on first use
+_LOAD_POOL = None
+_LOAD_POOL_SIZE = 8
+
+# Set when the library is kept in SQLite rather than in memory
+_LIBRARY_STORE = None
+
+# Clients for the remote backends, created on first use
 _CROSSREF = None
-if PUBMED_AVAILABLE:
-    _PUBMED = PubMed(tool='JAMCiter', email='joshuamitchell@anu.edu.au')
+_PUBMED = None
+_HTTP_SESSION = None
+# Worker threads that run remote searches, created on first use
+_SEARCH_POOL = None
+_SEARCH_POOL_SIZE = 4
+# The remote search whose results will be shown; any other is dropped
+_CURRENT_SEARCH = None
+# Recent results of remote queries by (backend, query), oldest first, and
+# the queries being fetched right now
+_REMOTE_RESULTS = OrderedDict()
+_REMOTE_PENDING = {}
+_REMOTE_LOCK = threading.Lock()
+REMOTE_RESULTS_SIZE = 64
+REMOTE_RESULTS_TTL = 600
+# Searching as the query is typed needs this many characters, and shows
+# this many results
+LIVE_SEARCH_MIN_LENGTH = 3
+LIVE_SEARCH_PREVIEW = 10
+# Remote results are fetched in a small first batch, shown straight away,
+# followed by the rest
+REMOTE_FIRST_BATCH = 5
+
+# Servers behind the remote backends, connected to ahead of the first search
+CROSSREF_URL = 'https://api.crossref.org'
+PUBMED_URL = 'https://eutils.ncbi.nlm.nih.gov'
+FIGSHARE_URL = 'https://api.figshare.com'
+# Connections kept open to each server; every search worker, and each
+# lookup it runs in parallel, can hold one
+HTTP_POOL_SIZE = 2 * _SEARCH_POOL_SIZE
+# Seconds after loading before warming up, to stay out of startup's way
+WARM_UP_DELAY = 2
+# Seconds that responses from each kind of URL are cached for; the first
+# match counts, and other URLs aren't cached
+HTTP_CACHE_TTLS = [
+    # Metadata of a single work rarely changes
+    (r'^https://api\.crossref\.org/works/.', 7 * 24 * 3600),
+    (r'^https://api\.crossref\.org/', 24 * 3600),
+    (r'^https://eutils\.ncbi\.nlm\.nih\.gov/.*/efetch', 7 * 24 * 3600),
+    (r'^https://eutils\.ncbi\.nlm\.nih\.gov/', 3600),
+    (r'^https://api\.figshare\.com/v2/articles/\d', 7 * 24 * 3600),
+    (r'^https://api\.figshare\.com/', 3600),
+]
 
 
 def plugin_loaded():
     """Called directly from sublime on plugin load
     """
+    settings = sublime.load_settings('JAMCiter.sublime-settings')
+    settings.add_on_change('jamciter', invalidate_settings)
     refresh_settings()
     refresh_caches()
+    sublime.set_timeout_async(warm_up, WARM_UP_DELAY * 1000)
 
 
 def plugin_unloaded():
-    pass
+    settings = sublime.load_settings('JAMCiter.sublime-settings')
+    settings.clear_on_change('jamciter')
+    if _CURRENT_SEARCH is not None:
+        _CURRENT_SEARCH.cancel()
+    if _SEARCH_POOL is not None:
+        _SEARCH_POOL.shutdown(wait=False)
+    if _LOAD_POOL is not None:
+        _LOAD_POOL.shutdown(wait=False)
+
+# Remote backends
+
+
+def crossref_client():
+    global _CROSSREF
+    session = http_session()
+    if (
+        _CROSSREF is None
+        or _CROSSREF.mailto != CROSSREF_MAILTO
+        or _CROSSREF.session is not session
+    ):
+        from habanero import Crossref
+        _CROSSREF = Crossref(mailto=CROSSREF_MAILTO, session=session)
+    return _CROSSREF
+
+
+def pubmed_client():
+    global _PUBMED
+    session = http_session()
+    if _PUBMED is None or _PUBMED.session is not session:
+        from pymed import PubMed
+        _PUBMED = PubMed(
+            tool='JAMCiter',
+            email='joshuamitchell@anu.edu.au',
+            session=session
+        )
+    return _PUBMED
+
+
+def parse_date(s):
+    import dateutil.parser
+    return dateutil.parser.parse(s)
+
+
+def http_session():
+    """Session shared by remote searches, so connections are reused
+
+    Each server gets its own pool of keep-alive connections, so a burst of
+    requests to one of them doesn't close the connections to the others.
+    Requests that don't set a timeout time out after search_timeout seconds.
+    Unless http_cache_size is 0, responses are cached on disk.
+    """
+    global _HTTP_SESSION
+    if _HTTP_SESSION is None:
+        import requests
+        session = requests.Session()
+        for url in (CROSSREF_URL, PUBMED_URL, FIGSHARE_URL):
+            session.mount(url + '/', requests.adapters.HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=HTTP_POOL_SIZE
+            ))
+        # get, post and head all go through request
+        session.request = functools.partial(
+            request_with_timeout,
+            session.request
+        )
+        if HTTP_CACHE_SIZE and sqlite3 is not None:
+            session = HTTPCache(
+                session,
+                os.path.join(sublime.cache_path(), 'JAMCiter', 'http.db'),
+                HTTP_CACHE_SIZE * 1024 * 1024
+            )
+        _HTTP_SESSION = session
+    return _HTTP_SESSION
+
+
+def request_with_timeout(request, method, url, **kwargs):
+    """Make a request through request, a Session's request method
+
+    A search that has timed out only drops its results, so without a
+    timeout here a hung connection would hold on to a search worker forever.
+    """
+    if SEARCH_TIMEOUT:
+        kwargs.setdefault('timeout', SEARCH_TIMEOUT)
+    return request(method, url, **kwargs)
+
+
+def warm_up():
+    """Get the library and remote backends ready before they're first used
+
+    Runs on the async thread shortly after the plugin is loaded. The library
+    is loaded and indexed, and if remote searches can be used their modules
+    are imported and a connection to each server is opened.
+    """
+    sublime.set_timeout(refresh_caches)
+
+    # Remote results can only be pasted into the output bibliography
+    if not OUTPUT_BIBFILE_PATH:
+        return
+    urls = []
+    if HABANERO_AVAILABLE:
+        crossref_client()
+        urls.append(CROSSREF_URL)
+    if PUBMED_AVAILABLE:
+        pubmed_client()
+        urls.append(PUBMED_URL)
+    if CHEMRXIV_AVAILABLE:
+        urls.append(FIGSHARE_URL)
+    if not urls:
+        return
+
+    parse_date('2000-01-01')
+    session = http_session()
+    for url in urls:
+        try:
+            session.head(url, timeout=5)
+        except Exception:
+            # The search itself will report any problem
+            pass
 
 # Papers
 
 
 def load_yamlbib_path(view):
-    global _PAPERS
-    global _YAMLBIB_PATH
+    global _YAMLBIB_PATHS
+
+    paper = _PAPERS.get(view.id())
+    if paper is None:
+        paper = _PAPERS[view.id()] = Paper(view)
+        while len(_PAPERS) > _PAPERS_SIZE:
+            _PAPERS.popitem(last=False)
+    else:
+        _PAPERS.move_to_end(view.id())
 
-    filename = view.file_name()
-    if filename not in _PAPERS:
-        _PAPERS[filename] = Paper(view)
+    _YAMLBIB_PATHS = paper.bibpaths()
+    return paper
 
-    _YAMLBIB_PATH = _PAPERS[filename].bibpath()
+
+def forget_paper(view):
+    _PAPERS.pop(view.id(), None)
 
 
 def condense_whitespace(s):
@@ -159,50 +371,108 @@ for s in [
 
 class Paper:
 
-    _filepath = None
-    _bibpath = None
-    _modified = None
+    _bibpaths = None
+    _change_count = None
+    # (paths, window id, Library) the view last resolved to
+    _library = None
+
+    # Read the front matter in chunks of this size, up to HEADER_LIMIT
+    HEADER_CHUNK = 4096
+    HEADER_LIMIT = 262144
 
     def __init__(self, view):
         self.view = view
-        self._filepath = view.file_name()
 
-    def bibpath(self):
+    def bibpaths(self):
+        """Bibliography files listed in the YAML front matter of the view
 
-        modified = os.path.getmtime(self._filepath)
-        if self._modified != modified:
-            self._modified = modified
-            self._bibpath = None
-
-            text = self.view.substr(sublime.Region(0, self.view.size()))
-            yamlP = re.compile(
-                r'^---$.*?((^---$)|(^\.\.\.$))',
-                re.MULTILINE | re.DOTALL
+        Only the front matter at the top of the buffer is read, and the
+        result is cached until the buffer changes.
+        """
+        change_count = self.view.change_count()
+        if self._change_count != change_count:
+            self._change_count = change_count
+            self._bibpaths = self._find_bibpaths()
+        return self._bibpaths
+
+    def library(self):
+        """The view's library, resolved again only when its paths or window
+        change or the library has been evicted
+        """
+        paths = library_paths()
+        window = self.view.window()
+        window_id = window.id() if window else None
+        cached = self._library
+        if (
+            cached is None
+            or cached[:2] != (paths, window_id)
+            or _LIBRARIES.get(cached[2].key) is not cached[2]
+        ):
+            if len(paths) == 0:
+                sublime.status_message(
+                    "WARNING: No BibTex file configured for Citer"
+                )
+                return None
+            cached = (paths, window_id, acquire_library(paths, window_id))
+            self._library = cached
+        cached[2].refresh()
+        return cached[2]
+
+    def _front_matter(self):
+        size = self.view.size()
+        end = 0
+        while end < min(size, self.HEADER_LIMIT):
+            end = min(end + self.HEADER_CHUNK, size)
+            text = self.view.substr(sublime.Region(0, end))
+            if not re.match(r'---[ \t]*\r?\n', text):
+                return None
+            closing = re.search(
+                r'^(---|\.\.\.)[ \t]*$',
+                text[3:],
+                re.MULTILINE
             )
-            yamlMatch = yamlP.search(text)
-
-            if yamlMatch:
-
-                bibP = re.compile(r'^bibliography:', re.MULTILINE)
-                bibMatch = bibP.search(yamlMatch.group())
-
-                if bibMatch:
-
-                    text = yamlMatch.group()[bibMatch.end():]
-                    pathP = re.compile(r'\S+')
-                    pathMatch = pathP.search(text)
-
-                    if pathMatch:
+            # A closing line at the very end may still be growing
+            if closing and (closing.end() + 3 < end or end == size):
+                return text[3:3 + closing.start()]
+        return None
 
-                        folder = os.path.dirname(
-                            os.path.realpath(self._filepath)
-                        )
-                        self._bibpath = os.path.join(
-                            folder,
-                            pathMatch.group()
-                        )
+    def _find_bibpaths(self):
+        front_matter = self._front_matter()
+        if front_matter is None:
+            return []
 
-        return self._bibpath
+        bibMatch = re.search(
+            r'^bibliography:[ \t]*(.*)$',
+            front_matter,
+            re.MULTILINE
+        )
+        if not bibMatch:
+            return []
+
+        value = bibMatch.group(1).strip()
+        if value.startswith('['):
+            # Flow sequence: bibliography: [a.bib, b.bib]
+            paths = value.strip('[]').split(',')
+        elif value:
+            paths = [value]
+        else:
+            # Block sequence of "- path" lines
+            paths = []
+            for line in front_matter[bibMatch.end():].splitlines()[1:]:
+                itemMatch = re.match(r'\s*-\s+(.*)$', line)
+                if not itemMatch:
+                    break
+                paths.append(itemMatch.group(1))
+
+        filepath = self.view.file_name()
+        folder = os.path.dirname(os.path.realpath(filepath)) if filepath else ''
+        bibpaths = []
+        for path in paths:
+            path = path.split(' #')[0].strip().strip('\'"')
+            if not path:
+                continue
+            bibpaths.append(os.path.join(folder, os.path.expanduser(path)))
+        return bibpaths
 
 # Bibfiles
 
@@ -217,41 +487,54 @@ def append_bibfile(bib_path, entry):
     })
     bibtex_str = to_bibtex(bibtex_db)
 
+    cache_path = os.path.expandvars(bib_path).strip()
+    identity = file_identity(cache_path)
+    library = refresh_caches()
+    # The reload in progress may or may not see the new entry
+    in_sync = (
+        library is not None
+        and not library.loading()
+        and identity is not None
+        and dict(library.snapshot.files).get(cache_path) == identity
+    )
+
     # append to the output file
     with open(bib_path, 'a') as bibtex_file:
         bibtex_file.write(bibtex_str)
 
-    refresh_caches()
-
+    if in_sync:
+        # Parse just the new entry rather than reloading the whole library
+        bp = BibTexParser(
+            bibtex_str,
+            customization=convert_to_unicode,
+            ignore_nonstandard_types=False
+        )
+        for doc in bp.get_entry_list():
+            library.add_document(cache_path, doc)
+        library.record_file_identity(cache_path)
+    else:
+        refresh_caches()
 
-def bibfile_modifed(bib_path):
-    global _LST_MOD_TIME
-    bib_path = bib_path.strip()
 
-    if not Path(bib_path).exists():
+def file_identity(bib_path):
+    """Modification time and size of bib_path, or None if it doesn't exist
+    """
+    try:
+        stat = os.stat(bib_path)
+    except OSError:
         sublime.status_message(
             "WARNING: BibTex file "
             + str(bib_path)
             + " not found"
         )
-        return False
-
-    last_modified_time = os.path.getmtime(bib_path)
-    cached_modified_time = _LST_MOD_TIME.get(bib_path)
-    if (
-        cached_modified_time is None
-        or last_modified_time != cached_modified_time
-    ):
-        _LST_MOD_TIME[bib_path] = last_modified_time
-        return True
-    else:
-        return False
+        return None
+    return (stat.st_mtime, stat.st_size)
 
 
 def load_bibfile(bib_path):
     if bib_path is None:
         sublime.status_message("WARNING: No BibTex file configured for Citer")
-        return {}
+        return []
 
     bib_path = Path(bib_path.strip())
     if not bib_path.exists():
@@ -260,7 +543,7 @@ def load_bibfile(bib_path):
             + str(bib_path)
             + " not found"
         )
-        return {}
+        return []
 
     with open(str(bib_path), 'r', encoding="utf-8") as bibfile:
         bp = BibTexParser(
@@ -271,27 +554,35 @@ def load_bibfile(bib_path):
         return list(bp.get_entry_list())
 
 
-def refresh_settings():
-    global BIBFILE_PATH
-    global CITATION_FORMAT
-    global COMPLETIONS_SCOPES
-    global EXCLUDED_SCOPES
-
-    global ENABLE_COMPLETIONS
-    global EXCLUDE
-    global PANDOC_FIX
-    global QUICKVIEW_FORMAT
-
-    global CITATION_RE
-    global SEARCH_COMPLETIONS
-
-    global CROSSREF_MAILTO
-    global OUTPUT_BIBFILE_PATH
-    global CROSSREF_LIMIT
-    global PUBMED_LIMIT
-    global CROSSREF_DATE_FIELD
-    global _CROSSREF
+def window_key(window):
+    """Identifies the window and project settings were resolved for"""
+    if window is None:
+        return None
+    return (window.id(), window.project_file_name())
 
+
+def invalidate_settings(window=None):
+    """Forget the resolved settings of window, or of every window"""
+    if window is None:
+        _WINDOW_SETTINGS.clear()
+    else:
+        _WINDOW_SETTINGS.pop(window_key(window), None)
+
+
+def ensure_settings():
+    """Apply the active window's settings if they aren't already applied,
+    resolving them only if they changed since they were last resolved
+    """
+    key = window_key(sublime.active_window())
+    if key != _SETTINGS_WINDOW or key not in _WINDOW_SETTINGS:
+        refresh_settings()
+
+
+def resolve_settings():
+    """Settings of the active window, its project's overriding the user's
+
+    Returns the value of each settings global by name.
+    """
     def get_settings(setting, default, is_path=False):
         project_data = sublime.active_window().project_data()
         project_citer_settings = project_data['settings'].get('citer', {})
@@ -311,70 +602,668 @@ def refresh_settings():
             return settings.get(setting, default)
 
     settings = sublime.load_settings('JAMCiter.sublime-settings')
-    BIBFILE_PATH = get_settings('bibtex_file_path', None, is_path=True)
-    CITATION_FORMAT = get_settings('citation_format', "@%s")
-    COMPLETIONS_SCOPES = get_settings('completions_scopes', ['text.html.markdown'])  # noqa: E501
-    EXCLUDED_SCOPES = get_settings('excluded_scopes', [])
-
-    ENABLE_COMPLETIONS = get_settings('enable_completions', True)
-    QUICKVIEW_FORMAT = get_settings('quickview_format', '{citekey} - {title}')
-    PANDOC_FIX = get_settings('auto_merge_citations', False)
-    EXCLUDE = get_settings('hide_other_completions', True)
-
-    SEARCH_COMPLETIONS = get_settings('use_search_for_completions', False)
-    CITATION_RE = get_settings('citation_regex', r'.*\[(@[a-zA-Z0-9_-]*;\s*)*?@$')  # noqa: E501
-
-    CROSSREF_MAILTO = get_settings('crossref_mailto', None)
-    OUTPUT_BIBFILE_PATH = get_settings('output_bib_file_path', None, is_path=True)  # noqa: E501
-    CROSSREF_LIMIT = get_settings('crossref_limit', 20)
-    PUBMED_LIMIT = get_settings('pubmed_limit', 20)
-    CROSSREF_DATE_FIELD = get_settings('crossref_date_field', 'issued')
-    CHEMRXIV_TOKEN = get_settings('chemrxiv_token', None)
-
-    if OUTPUT_BIBFILE_PATH:
-        if len(OUTPUT_BIBFILE_PATH) > 1:
+    resolved = {
+        'BIBFILE_PATH': get_settings('bibtex_file_path', None, is_path=True),
+        'CITATION_FORMAT': get_settings('citation_format', "@%s"),
+        'COMPLETIONS_SCOPES': get_settings('completions_scopes', ['text.html.markdown']),  # noqa: E501
+        'EXCLUDED_SCOPES': get_settings('excluded_scopes', []),
+
+        'ENABLE_COMPLETIONS': get_settings('enable_completions', True),
+        'QUICKVIEW_FORMAT': get_settings('quickview_format', '{citekey} - {title}'),  # noqa: E501
+        'PANDOC_FIX': get_settings('auto_merge_citations', False),
+        'EXCLUDE': get_settings('hide_other_completions', True),
+
+        'SEARCH_COMPLETIONS': get_settings('use_search_for_completions', False),  # noqa: E501
+        'CITATION_RE': get_settings('citation_regex', r'.*\[(@[a-zA-Z0-9_-]*;\s*)*?@$'),  # noqa: E501
+        'COMPLETIONS_LIMIT': get_settings('completions_limit', 100),
+        'LIBRARY_SEARCH_LIMIT': get_settings('library_search_limit', 50),
+
+        'CROSSREF_MAILTO': get_settings('crossref_mailto', None),
+        'OUTPUT_BIBFILE_PATH': get_settings('output_bib_file_path', None, is_path=True),  # noqa: E501
+        'CROSSREF_LIMIT': get_settings('crossref_limit', 20),
+        'PUBMED_LIMIT': get_settings('pubmed_limit', 20),
+        'CROSSREF_DATE_FIELD': get_settings('crossref_date_field', 'issued'),
+        'CHEMRXIV_TOKEN': get_settings('chemrxiv_token', None),
+        'LIBRARY_BACKEND': get_settings('library_backend', 'memory'),
+        'LIBRARY_CACHE_SIZE': get_settings('library_cache_size', 4),
+        'SEARCH_TIMEOUT': get_settings('search_timeout', 20),
+        'LIVE_SEARCH_DELAY': get_settings('live_search_delay', 400),
+        'HTTP_CACHE_SIZE': get_settings('http_cache_size', 50),
+    }
+
+    output_path = resolved['OUTPUT_BIBFILE_PATH']
+    if output_path:
+        if len(output_path) > 1:
             raise ValueError("Configure only one output_bib_file_path")
-        OUTPUT_BIBFILE_PATH = OUTPUT_BIBFILE_PATH[0]
+        output_path = resolved['OUTPUT_BIBFILE_PATH'] = output_path[0]
 
-        if BIBFILE_PATH and OUTPUT_BIBFILE_PATH not in BIBFILE_PATH:
+        bibfile_path = resolved['BIBFILE_PATH']
+        if bibfile_path and output_path not in bibfile_path:
             raise ValueError(
                 "output_bib_file_path should be one of the input files"
             )
+    return resolved
 
-    if HABANERO_AVAILABLE:
-        _CROSSREF = Crossref(mailto=CROSSREF_MAILTO)
 
-    if CHEMRXIV_TOKEN is None:
-        CHEMRXIV_AVAILABLE = False
+def refresh_settings():
+    """Apply the active window's settings, resolving them unless they're
+    cached
+    """
+    global _SETTINGS_WINDOW
+    global _HTTP_SESSION
+    global _LIBRARY_STORE
+
+    key = window_key(sublime.active_window())
+    resolved = _WINDOW_SETTINGS.get(key)
+    if resolved is None:
+        resolved = _WINDOW_SETTINGS[key] = resolve_settings()
+
+    if resolved['HTTP_CACHE_SIZE'] != HTTP_CACHE_SIZE:
+        # Clients pick the new session up the next time they're used
+        if isinstance(_HTTP_SESSION, HTTPCache):
+            _HTTP_SESSION.close()
+        _HTTP_SESSION = None
+    globals().update(resolved)
+
+    if LIBRARY_BACKEND == 'sqlite' and not SQLITE_AVAILABLE:
+        sublime.status_message(
+            "WARNING: SQLite with FTS5 is not available, "
+            "keeping the Citer library in memory"
+        )
+    if LIBRARY_BACKEND == 'sqlite' and SQLITE_AVAILABLE:
+        if _LIBRARY_STORE is None:
+            _LIBRARY_STORE = LibraryStore(
+                os.path.join(sublime.cache_path(), 'JAMCiter', 'library.db')
+            )
+            reset_libraries()
+    elif _LIBRARY_STORE is not None:
+        _LIBRARY_STORE.close()
+        _LIBRARY_STORE = None
+        reset_libraries()
 
+    _SETTINGS_WINDOW = key
 
-def refresh_caches():
-    global _DOCUMENTS
-    global _MENU
-    global _CITEKEYS
+
+def library_paths():
+    """The bibliography files that make up the library, in order"""
     paths = []
     if BIBFILE_PATH is not None:
         if isinstance(BIBFILE_PATH, list):
             paths += [os.path.expandvars(path) for path in BIBFILE_PATH]
         else:
             paths.append(os.path.expandvars(BIBFILE_PATH))
-    if _YAMLBIB_PATH is not None:
-        paths.append(_YAMLBIB_PATH)
+    paths += _YAMLBIB_PATHS
+    return [single_path.strip() for single_path in paths]
+
+
+def library_key(paths):
+    """Registry key for the library made of paths, ignoring order"""
+    return tuple(sorted(set(
+        os.path.normcase(os.path.normpath(single_path))
+        for single_path in paths
+    )))
+
+
+def refresh_caches(view=None):
+    """The active window's library, reloaded in the background if any of its
+    bibliographies changed
+
+    Only the files' identities are checked here, so this is cheap enough to
+    call from completions. The previous snapshot keeps being served until
+    the reload has finished. Returns None if no bibliography is configured.
+    Given a view, its YAML bibliographies are included and the library is
+    looked up through the view's Paper.
+    """
+    if view is not None:
+        return load_yamlbib_path(view).library()
+
+    paths = library_paths()
 
     if len(paths) == 0:
         sublime.status_message("WARNING: No BibTex file configured for Citer")
+        return None
+
+    window = sublime.active_window()
+    library = acquire_library(paths, window.id() if window else None)
+    library.refresh()
+    return library
+
+
+def acquire_library(paths, window_id):
+    """The registered library for paths, used by the window window_id
+
+    Libraries used by a window are kept until no window uses them; at most
+    library_cache_size unused ones are kept as well, dropping the least
+    recently used first.
+    """
+    key = library_key(paths)
+    library = _LIBRARIES.get(key)
+    if library is None:
+        library = Library(key, paths)
+        _LIBRARIES[key] = library
     else:
+        _LIBRARIES.move_to_end(key)
+
+    old_key = _WINDOW_LIBRARIES.get(window_id)
+    if old_key != key:
+        if old_key in _LIBRARIES:
+            _LIBRARIES[old_key].windows.discard(window_id)
+        library.windows.add(window_id)
+        _WINDOW_LIBRARIES[window_id] = key
+        evict_libraries()
+    return library
+
+
+def release_window(window_id):
+    """Stop counting window_id as a user of its library"""
+    key = _WINDOW_LIBRARIES.pop(window_id, None)
+    if key in _LIBRARIES:
+        _LIBRARIES[key].windows.discard(window_id)
+        evict_libraries()
+
+
+def evict_libraries():
+    unused = [
+        key
+        for key, library in _LIBRARIES.items()
+        if not library.windows
+    ]
+    for key in unused[:max(0, len(unused) - (LIBRARY_CACHE_SIZE or 0))]:
+        del _LIBRARIES[key]
+
+    # Forget parsed files that no remaining library uses
+    in_use = set()
+    for library in _LIBRARIES.values():
+        in_use.update(library.snapshot.files)
+        in_use.update(library.requested_files or ())
+    for file_key in list(_PARSED_FILES):
+        if file_key not in in_use:
+            _PARSED_FILES.pop(file_key, None)
+    if _LIBRARY_STORE is not None:
+        _LIBRARY_STORE.prune(set(
+            path
+            for library in _LIBRARIES.values()
+            for path in library.paths
+        ))
+
+
+def reset_libraries():
+    """Drop every loaded library and everything derived from them"""
+    _LIBRARIES.clear()
+    _WINDOW_LIBRARIES.clear()
+    _PARSED_FILES.clear()
+
+
+def load_pool():
+    global _LOAD_POOL
+    if _LOAD_POOL is None:
+        _LOAD_POOL = concurrent.futures.ThreadPoolExecutor(
+            max_workers=_LOAD_POOL_SIZE
+        )
+    return _LOAD_POOL
+
+
+def load_bibfiles(paths):
+    """Entries of each bibliography at paths, in the order given
+
+    Each file is read and parsed by its own worker so that reading them
+    overlaps. A single file is parsed on the calling thread. The workers
+    only parse, they don't touch any shared state.
+    """
+    if len(paths) < 2:
+        return [load_bibfile(path) for path in paths]
+    return list(load_pool().map(load_bibfile, paths))
+
+
+def parse_bibfiles(files):
+    """Entries of each bibliography in files, a sequence of (path, identity)
+
+    Each file is parsed at most once per identity. Files that haven't been
+    parsed yet are parsed together by load_bibfiles, and are remembered on
+    the calling thread once they're all done.
+    """
+    parsed = [_PARSED_FILES.get(file_key) for file_key in files]
+    missing = [i for i, docs in enumerate(parsed) if docs is None]
+    loaded = load_bibfiles([files[i][0] for i in missing])
+    for i, docs in zip(missing, loaded):
+        path, identity = files[i]
+        parsed[i] = tuple(docs)
+        if identity is not None:
+            remember_parsed_file(path, identity, parsed[i])
+    return parsed
+
+
+def remember_parsed_file(path, identity, docs):
+    # Older versions of the file won't be asked for again
+    for file_key in list(_PARSED_FILES):
+        if file_key[0] == path:
+            _PARSED_FILES.pop(file_key, None)
+    _PARSED_FILES[(path, identity)] = docs
+
+
+class StatusSpinner:
+    """Animated status bar message shown while background work runs"""
+
+    FRAMES = ['[=   ]', '[ =  ]', '[  = ]', '[   =]', '[  = ]', '[ =  ]']
+    INTERVAL = 100
+
+    def __init__(self, key, message):
+        self.key = key
+        self.message = message
+        self._running = False
+        # Bumped on every start, so ticks left over from an earlier run stop
+        self._run = 0
+        self._frame = 0
+        self._views = []
+
+    def start(self, message=None):
+        if message is not None:
+            self.message = message
+        if not self._running:
+            self._running = True
+            self._run += 1
+            run = self._run
+            sublime.set_timeout(lambda: self._tick(run), 0)
+
+    def stop(self):
+        self._running = False
+        for view in self._views:
+            view.erase_status(self.key)
+        self._views = []
+
+    def _tick(self, run):
+        if not self._running or run != self._run:
+            return
+        window = sublime.active_window()
+        view = window.active_view() if window else None
+        if view is not None:
+            view.set_status(
+                self.key,
+                '{} {}'.format(self.message, self.FRAMES[self._frame])
+            )
+            if view not in self._views:
+                self._views.append(view)
+        self._frame = (self._frame + 1) % len(self.FRAMES)
+        sublime.set_timeout(lambda: self._tick(run), self.INTERVAL)
+
+
+_LOAD_SPINNER = StatusSpinner('jamciter_load', 'Citer: loading library')
+_SEARCH_SPINNER = StatusSpinner('jamciter_search', 'Citer: searching')
+
+
+def search_pool():
+    global _SEARCH_POOL
+    if _SEARCH_POOL is None:
+        _SEARCH_POOL = concurrent.futures.ThreadPoolExecutor(
+            max_workers=_SEARCH_POOL_SIZE
+        )
+    return _SEARCH_POOL
+
+
+class RemoteSearch(object):
+    """A query to a remote backend, run on the search pool
+
+    fetch is called on a worker thread, and its result is passed to on_done
+    on the main thread. Only the latest search is shown: starting another
+    one, cancelling it or running past search_timeout drops the result.
+    """
+
+    def __init__(self, name, fetch, on_done):
+        self.name = name
+        self.fetch = fetch
+        self.on_done = on_done
+        self.cancelled = False
+        self._futures = []
+
+    def _fetches(self):
+        return [self.fetch]
+
+    def start(self):
+        global _CURRENT_SEARCH
+        if _CURRENT_SEARCH is not None:
+            _CURRENT_SEARCH.cancel()
+        _CURRENT_SEARCH = self
+
+        _SEARCH_SPINNER.start('Citer: searching {}'.format(self.name))
+        self._futures = [
+            search_pool().submit(fetch)
+            for fetch in self._fetches()
+        ]
+        for future in self._futures:
+            future.add_done_callback(
+                lambda future: sublime.set_timeout(self._finish)
+            )
+        if SEARCH_TIMEOUT:
+            sublime.set_timeout(self._time_out, int(SEARCH_TIMEOUT * 1000))
+        return self
+
+    def active(self):
+        return _CURRENT_SEARCH is self and not self.cancelled
+
+    def cancel(self, message=None):
+        """Drop the search; the request itself is left to finish"""
+        global _CURRENT_SEARCH
+        if self.cancelled:
+            return
+        self.cancelled = True
+        for future in self._futures:
+            future.cancel()
+        if _CURRENT_SEARCH is self:
+            _CURRENT_SEARCH = None
+            _SEARCH_SPINNER.stop()
+        if message is not None:
+            sublime.status_message(message)
+
+    def _time_out(self):
+        if self.active():
+            self.cancel("{} search timed out".format(self.name))
+
+    def _finish(self):
+        if not self.active() or not all(f.done() for f in self._futures):
+            return
+        self.cancel()
+        self.on_done(self._result())
+
+    def _result(self):
+        try:
+            return self._futures[0].result()
+        except Exception:
+            sublime.status_message("{} search failed".format(self.name))
+            raise
+
+
+class FederatedSearch(RemoteSearch):
+    """Several remote queries run at once, finishing with the slowest
+
+    fetches maps the name of each backend to its fetch function, and
+    on_done is passed a list of (name, result) pairs in the same order.
+    Backends that fail are left out so the others can still be shown.
+
+    Each fetch function is passed a function to call with every batch of
+    results as they arrive, which are then passed to on_batch along with
+    the backend's name on the main thread.
+    """
+
+    def __init__(self, name, fetches, on_done, on_batch=None):
+        super(FederatedSearch, self).__init__(name, None, on_done)
+        self.fetches = OrderedDict(fetches)
+        self.on_batch = on_batch
+
+    def _fetches(self):
+        return [
+            functools.partial(fetch, functools.partial(self._emit, source))
+            for source, fetch in self.fetches.items()
+        ]
+
+    def _emit(self, source, batch):
+        if self.on_batch is not None:
+            sublime.set_timeout(
+                functools.partial(self._batch, source, batch)
+            )
+
+    def _batch(self, source, batch):
+        if self.active():
+            self.on_batch(source, batch)
+
+    def _result(self):
+        results = []
+        failed = []
+        for source, future in zip(self.fetches, self._futures):
+            try:
+                results.append((source, future.result()))
+            except Exception as e:
+                print("Citer: {} search failed: {!r}".format(source, e))
+                failed.append(source)
+        if failed:
+            sublime.status_message(
+                "{} search failed".format(', '.join(failed))
+            )
+        return results
+
+
+class RateLimiter(object):
+    """Spaces calls out to at most one every interval seconds"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+# Queries to each backend are kept within its rate limit. PubMed allows three
+# requests a second without an API key, and each query takes at least two.
+RATE_LIMITS = {
+    "CrossRef": RateLimiter(0.2),
+    "PubMed": RateLimiter(1.0),
+    "ChemRxiv": RateLimiter(0.5),
+}
+
+
+def remote_batches(total):
+    """(offset, size) of the batches to fetch total results in"""
+    if total <= 0:
+        return []
+    if total <= REMOTE_FIRST_BATCH:
+        return [(0, total)]
+    return [
+        (0, REMOTE_FIRST_BATCH),
+        (REMOTE_FIRST_BATCH, total - REMOTE_FIRST_BATCH)
+    ]
+
+
+def remote_fetch(name, fetch, query, emit=None):
+    """All results of fetch(query) for the backend name, on a worker thread
+
+    fetch yields the results in batches, each of which is passed to emit as
+    it arrives. The result of the same query made recently is reused, and a
+    query that is already being fetched is waited for rather than sent again,
+    for up to search_timeout seconds.
+    """
+    key = (name, ' '.join(query.lower().split()))
+    # Whether this call is the one fetching key for everyone else
+    owner = False
+    while True:
+        with _REMOTE_LOCK:
+            entry = _REMOTE_RESULTS.get(key)
+            if entry is not None and (
+                time.monotonic() - entry[0] < REMOTE_RESULTS_TTL
+            ):
+                _REMOTE_RESULTS.move_to_end(key)
+                if emit is not None:
+                    emit(entry[1])
+                return entry[1]
+            pending = _REMOTE_PENDING.get(key)
+            if pending is None:
+                pending = _REMOTE_PENDING[key] = threading.Event()
+                owner = True
+                break
+        # If that fetch fails, try again ourselves, and if it hangs, fetch
+        # without it
+        if not pending.wait(SEARCH_TIMEOUT or None):
+            break
+
+    try:
+        if name in RATE_LIMITS:
+            RATE_LIMITS[name].wait()
+        result = []
+        for batch in fetch(query):
+            result += batch
+            if emit is not None:
+                emit(batch)
+        with _REMOTE_LOCK:
+            _REMOTE_RESULTS[key] = (time.monotonic(), result)
+            while len(_REMOTE_RESULTS) > REMOTE_RESULTS_SIZE:
+                _REMOTE_RESULTS.popitem(last=False)
+        return result
+    finally:
+        if owner:
+            with _REMOTE_LOCK:
+                del _REMOTE_PENDING[key]
+            pending.set()
+
+
+class Library(object):
+    """A registered set of bibliography files and their latest snapshot
+
+    The snapshot attribute is an immutable LibrarySnapshot that is only ever
+    rebound, so readers can use it without locking.
+    """
+
+    def __init__(self, key, paths):
+        self.key = key
+        self.paths = list(paths)
+        self.snapshot = LibrarySnapshot(store=_LIBRARY_STORE is not None)
+        # Windows currently using this library
+        self.windows = set()
+        # File identities the latest load was started for
+        self.requested_files = None
+        # Reloads run in the background; only the latest one is published
+        self.load_token = 0
+        self.published_token = 0
+        self.search_building = None
+
+    def loading(self):
+        """Whether a reload of the library is in progress"""
+        return self.load_token != self.published_token
+
+    def refresh(self):
         # To avoid duplicate entries, reload all bibfiles if any were modified
-        modified = False
-        for single_path in paths:
-            modified = modified or bibfile_modifed(single_path)
-        if modified:
-            _DOCUMENTS = []
-            for single_path in paths:
-                _DOCUMENTS += load_bibfile(single_path)
+        files = tuple(
+            (single_path, file_identity(single_path))
+            for single_path in self.paths
+        )
+        if files != self.requested_files:
+            self.requested_files = files
+            self.load_token += 1
+            _LOAD_SPINNER.start()
+            sublime.set_timeout_async(
+                functools.partial(self._load, files, self.load_token)
+            )
+
+        snapshot = self.snapshot
+        if (
+            _LIBRARY_STORE is None
+            and not self.loading()
+            and snapshot.search_generation != snapshot.generation
+            and self.search_building != snapshot.generation
+        ):
+            # Building the search indexes is slow for large libraries, so do
+            # it on the async thread and keep serving the previous ones
+            self.search_building = snapshot.generation
+            sublime.set_timeout_async(
+                functools.partial(self._build_search_indexes, snapshot)
+            )
+
+    def _load(self, files, token):
+        """Parse the bibliographies in files on the async thread"""
+        try:
+            if _LIBRARY_STORE is not None:
+                changed = _LIBRARY_STORE.sync([path for path, _ in files])
+                # Another library may have synced the files already
+                changed = changed or files != self.snapshot.files
+                snapshot = LibrarySnapshot(files=files, store=True)
+            else:
+                changed = True
+                snapshot = LibrarySnapshot.load(files)
+            sublime.set_timeout(
+                functools.partial(self._publish, token, snapshot, changed)
+            )
+        except Exception:
+            # Don't leave the spinner running forever
+            sublime.set_timeout(
+                functools.partial(self._publish, token, None, False)
+            )
+            raise
+
+    def _publish(self, token, snapshot, changed):
+        """Swap a freshly loaded snapshot in, on the main thread"""
+        # A newer load has been started since, so this one is already stale
+        if token != self.load_token:
+            return
+
+        if snapshot is not None and changed:
+            # Keep serving the previous search indexes until the new ones
+            # are built
+            self.snapshot = snapshot.replace(
+                generation=self.snapshot.generation + 1,
+                fuzzy_index=self.snapshot.fuzzy_index,
+                fulltext_index=self.snapshot.fulltext_index,
+                search_generation=self.snapshot.search_generation
+            )
+        elif snapshot is not None:
+            # Nothing in the store changed, so the cached rows are still good
+            self.snapshot = self.snapshot.replace(files=snapshot.files)
+        self.published_token = token
+        if not any(library.loading() for library in _LIBRARIES.values()):
+            _LOAD_SPINNER.stop()
+
+        # Start building the search indexes
+        self.refresh()
+
+    def _build_search_indexes(self, snapshot):
+        """Build the search indexes for snapshot on the async thread"""
+        fuzzy_index = FuzzyIndex(snapshot.documents)
+        fulltext_index = FullTextIndex(snapshot.documents)
+        sublime.set_timeout(functools.partial(
+            self._publish_search_indexes,
+            snapshot.generation,
+            fuzzy_index,
+            fulltext_index
+        ))
+
+    def _publish_search_indexes(self, generation, fuzzy_index, fulltext_index):
+        snapshot = self.snapshot
+        # Indexes for a newer library than the published ones are an
+        # improvement even if the library has changed again since
+        if (
+            snapshot.search_generation is None
+            or snapshot.search_generation < generation <= snapshot.generation
+        ):
+            self.snapshot = snapshot.replace(
+                fuzzy_index=fuzzy_index,
+                fulltext_index=fulltext_index,
+                search_generation=generation
+            )
+        self.refresh()
 
-    _CITEKEYS = [doc.get('id') for doc in _DOCUMENTS]
-    _MENU = _make_citekey_menu_list(_DOCUMENTS)
+    def add_document(self, bib_path, doc):
+        """Add a single entry appended to bib_path to the library
+
+        The derived caches of the current snapshot are carried over to the
+        new one with the entry inserted, so appending never forces a full
+        rebuild.
+        """
+        position = None
+        if _LIBRARY_STORE is not None:
+            position = _LIBRARY_STORE.add(self.paths, bib_path, doc)
+        self.snapshot = self.snapshot.with_document(bib_path, doc, position)
+
+    def record_file_identity(self, bib_path):
+        """Note that the library is up to date with bib_path as it is now"""
+        identity = file_identity(bib_path)
+        files = tuple(
+            (path, identity if path == bib_path else old)
+            for path, old in self.snapshot.files
+        )
+        self.snapshot = self.snapshot.replace(files=files)
+        self.requested_files = files
+        if _LIBRARY_STORE is not None and identity is not None:
+            _LIBRARY_STORE.set_mtime(bib_path, identity[0])
+        elif identity is not None:
+            # Other libraries with this file can reuse the updated entries
+            remember_parsed_file(
+                bib_path,
+                identity,
+                self.snapshot.documents_by_path[bib_path]
+            )
 
 
 # Do some fancy build to get a sane list in the UI
@@ -404,56 +1293,1168 @@ def _parse_authors(auth):
     return authors_abbr
 
 
-def _make_citekey_menu_list(bibdocs):
-    citekeys = []
-    for doc in bibdocs:
-        menu_entry = []
+def _make_citekey_menu_entry(doc, quickview_format=None):
+    if doc.get('author') is not None:
+        auths = _parse_authors(doc.get('author'))
+    else:
+        auths = 'Anon'
+    title = string.Formatter().vformat(
+        quickview_format or QUICKVIEW_FORMAT,
+        (),
+        SafeDict(
+             citekey=doc.get('id'),
+             title=doc.get('title'),
+             author=auths,
+             year=doc.get('year')
+             )
+        )
+    # title = QUICKVIEW_FORMAT.format(
+    #     citekey=doc.get('id'), title=doc.get('title'))
+    return [title]
 
-        if doc.get('author') is not None:
-            auths = _parse_authors(doc.get('author'))
-        else:
-            auths = 'Anon'
-        title = string.Formatter().vformat(
-            QUICKVIEW_FORMAT,
-            (),
-            SafeDict(
-                 citekey=doc.get('id'),
-                 title=doc.get('title'),
-                 author=auths,
-                 year=doc.get('year')
-                 )
-            )
-        # title = QUICKVIEW_FORMAT.format(
-        #     citekey=doc.get('id'), title=doc.get('title'))
-        menu_entry.append(title)
-        citekeys.append(menu_entry)
+
+def _make_citekey_menu_list(bibdocs, quickview_format=None):
+    citekeys = [
+        _make_citekey_menu_entry(doc, quickview_format)
+        for doc in bibdocs
+    ]
     citekeys = sorted(citekeys)
     return citekeys
 
 
+class CitekeyIndex:
+    """Sorted, case-insensitive index of citekeys for completions
+
+    Prefix matches are found by bisecting the sorted lowercase keys. Infix
+    matches are found by scanning a single newline-joined string of all the
+    keys, which keeps the per-character work inside str.find.
+    """
+
+    def __init__(self, citekeys=()):
+        pairs = sorted((key.lower(), key) for key in citekeys if key)
+        self._lower = [lower for lower, key in pairs]
+        self._keys = [key for lower, key in pairs]
+        self._haystack = None
+        self._starts = None
+
+    def __len__(self):
+        return len(self._keys)
+
+    def added(self, citekey):
+        """A new index that also contains citekey"""
+        index = CitekeyIndex()
+        index._lower = list(self._lower)
+        index._keys = list(self._keys)
+        if citekey:
+            i = bisect.bisect_right(index._lower, citekey.lower())
+            index._lower.insert(i, citekey.lower())
+            index._keys.insert(i, citekey)
+        return index
+
+    def _build_haystack(self):
+        self._starts = []
+        offset = 0
+        for lower in self._lower:
+            self._starts.append(offset)
+            offset += len(lower) + 1
+        self._haystack = '\n'.join(self._lower)
+
+    def complete(self, search, limit=None):
+        """Citekeys containing search, prefix matches first
+
+        Prefix matches are returned in alphabetical order, followed by infix
+        matches ranked by how early in the key the match occurs, then by
+        length. Only the best limit matches are returned.
+        """
+        search = search.lower()
+        results = []
+
+        i = bisect.bisect_left(self._lower, search)
+        while (
+            i < len(self._lower)
+            and self._lower[i].startswith(search)
+            and (limit is None or len(results) < limit)
+        ):
+            results.append(self._keys[i])
+            i += 1
+
+        if not search or '\n' in search:
+            return results
+        if limit is not None and len(results) >= limit:
+            return results
+        if self._haystack is None:
+            self._build_haystack()
+
+        # Every infix match has to be found before the best can be picked
+        infix = []
+        pos = self._haystack.find(search)
+        while pos != -1:
+            i = bisect.bisect_right(self._starts, pos) - 1
+            start = self._starts[i]
+            if pos != start:
+                infix.append((pos - start, len(self._keys[i]), i))
+            # Skip to the next key; a key is listed at most once
+            pos = self._haystack.find(search, start + len(self._lower[i]) + 1)
+        if limit is None:
+            infix.sort()
+        else:
+            infix = heapq.nsmallest(limit - len(results), infix)
+        results += [self._keys[i] for _, _, i in infix]
+        return results
+
+
+_COMBINING_RE = re.compile('[\u0300-\u036f]')
+_WORD_RE = re.compile(r'\w+')
+
+
+def normalize_text(s):
+    """Lowercase s and reduce it to unaccented alphanumeric words"""
+    s = unicodedata.normalize('NFKD', strip_latex(str(s)))
+    s = _COMBINING_RE.sub('', s)
+    return ' '.join(_WORD_RE.findall(s.lower()))
+
+
+DOI_PREFIXES = (
+    'https://doi.org/',
+    'http://doi.org/',
+    'https://dx.doi.org/',
+    'http://dx.doi.org/',
+    'doi:',
+)
+
+
+def normalize_doi(doi):
+    """doi in a form that compares equal however it was written, or None"""
+    words = (doi or '').lower().split()
+    if not words:
+        return None
+    doi = words[0]
+    for prefix in DOI_PREFIXES:
+        if doi.startswith(prefix):
+            return doi[len(prefix):] or None
+    return doi
+
+
+def author_surnames(auth):
+    """Surnames from a BibTeX author field, in order"""
+    surnames = []
+    for name in str(auth).split(' and '):
+        if ',' in name:
+            surname = name.split(',')[0]
+        else:
+            surname = name.split()[-1] if name.split() else ''
+        surnames.append(strip_latex(surname))
+    return surnames
+
+
+class FuzzyIndex:
+    """Trigram inverted index over citekey, author surnames, title and year
+
+    Each entry is indexed by the set of trigrams of its normalized words.
+    Queries are ranked by the fraction of their trigrams an entry shares,
+    so typos and word fragments still find the intended entry.
+    """
+
+    def __init__(self, docs=()):
+        self._docs = []
+        self._sizes = []
+        self._postings = defaultdict(list)
+        for doc in docs:
+            self.add(doc)
+
+    def __len__(self):
+        return len(self._docs)
+
+    # Words repeat a lot across a library, so remember their trigrams
+    _word_trigrams = {}
+
+    @classmethod
+    def trigrams(cls, text):
+        grams = set()
+        for word in normalize_text(text).split():
+            word_grams = cls._word_trigrams.get(word)
+            if word_grams is None:
+                padded = ' ' + word + ' '
+                word_grams = frozenset(
+                    padded[i:i + 3] for i in range(len(padded) - 2)
+                )
+                if len(cls._word_trigrams) < 100000:
+                    cls._word_trigrams[word] = word_grams
+            grams |= word_grams
+        return grams
+
+    @staticmethod
+    def doc_text(doc):
+        return ' '.join([
+            str(doc.get('id') or ''),
+            ' '.join(author_surnames(doc.get('author') or '')),
+            str(doc.get('title') or ''),
+            str(doc.get('year') or ''),
+        ])
+
+    def add(self, doc):
+        i = len(self._docs)
+        grams = self.trigrams(self.doc_text(doc))
+        self._docs.append(doc)
+        self._sizes.append(len(grams))
+        postings = self._postings
+        for gram in grams:
+            postings[gram].append(i)
+
+    def added(self, doc):
+        """A new index that also contains doc
+
+        Only the postings of doc's trigrams are copied, the rest are shared
+        with this index, so earlier snapshots are left as they are.
+        """
+        index = FuzzyIndex()
+        i = len(self._docs)
+        grams = self.trigrams(self.doc_text(doc))
+        index._docs = self._docs + [doc]
+        index._sizes = self._sizes + [len(grams)]
+        index._postings = defaultdict(list, self._postings)
+        for gram in grams:
+            index._postings[gram] = index._postings[gram] + [i]
+        return index
+
+    def _citekey(self, i):
+        return (self._docs[i].get('id') or '').lower()
+
+    def search(self, query, limit=None, threshold=0.5):
+        """Entries matching query, best first
+
+        Entries sharing fewer than threshold of the query's trigrams are
+        dropped. Ties go to the entry with fewer trigrams, i.e. the one the
+        query describes more completely, and then to the lower citekey.
+        """
+        grams = self.trigrams(query)
+        if not grams:
+            return []
+
+        counts = Counter()
+        for gram in grams:
+            counts.update(self._postings.get(gram, ()))
+
+        minimum = threshold * len(grams)
+        scored = (
+            (-count, self._sizes[i], self._citekey(i), i)
+            for i, count in counts.items()
+            if count >= minimum
+        )
+        if limit is None:
+            ranked = sorted(scored)
+        else:
+            ranked = heapq.nsmallest(limit, scored)
+        return [self._docs[i] for _, _, _, i in ranked]
+
+
+class FullTextIndex:
+    """Inverted index over the text fields of each entry, ranked with BM25
+
+    Field text is normalized to unaccented lowercase words without any
+    stemming. Words in more important fields count more than once towards
+    an entry's term frequencies.
+    """
+
+    FIELD_WEIGHTS = OrderedDict([
+        ('title', 3),
+        ('author', 2),
+        ('keywords', 2),
+        ('journal', 1),
+        ('booktitle', 1),
+        ('abstract', 1),
+    ])
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, docs=()):
+        self._docs = []
+        self._lengths = []
+        self._total_length = 0
+        self._postings = defaultdict(list)
+        for doc in docs:
+            self.add(doc)
+
+    def __len__(self):
+        return len(self._docs)
+
+    @staticmethod
+    def tokenize(text):
+        return normalize_text(text).split()
+
+    @classmethod
+    def frequencies(cls, doc):
+        """Weighted frequency of each term in doc"""
+        frequencies = Counter()
+        for field, weight in cls.FIELD_WEIGHTS.items():
+            value = doc.get(field)
+            if field == 'keywords' and value is None:
+                value = doc.get('keyword')
+            if not value:
+                continue
+            for term in cls.tokenize(value):
+                frequencies[term] += weight
+        return frequencies
+
+    def add(self, doc):
+        i = len(self._docs)
+        frequencies = self.frequencies(doc)
+        length = sum(frequencies.values())
+
+        self._docs.append(doc)
+        self._lengths.append(length)
+        self._total_length += length
+        for term, frequency in frequencies.items():
+            self._postings[term].append((i, frequency))
+
+    def added(self, doc):
+        """A new index that also contains doc
+
+        Only the postings of doc's terms are copied, the rest are shared
+        with this index, so earlier snapshots are left as they are.
+        """
+        index = FullTextIndex()
+        i = len(self._docs)
+        frequencies = self.frequencies(doc)
+        length = sum(frequencies.values())
+
+        index._docs = self._docs + [doc]
+        index._lengths = self._lengths + [length]
+        index._total_length = self._total_length + length
+        index._postings = defaultdict(list, self._postings)
+        for term, frequency in frequencies.items():
+            index._postings[term] = index._postings[term] + [(i, frequency)]
+        return index
+
+    def search(self, query, limit=None):
+        """Entries containing any word of query, best BM25 score first
+
+        Ties go to the lower citekey.
+        """
+        n = len(self._docs)
+        if n == 0:
+            return []
+        average_length = self._total_length / n
+
+        scores = defaultdict(float)
+        for term in set(self.tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for i, tf in postings:
+                norm = self.K1 * (
+                    1 - self.B + self.B * self._lengths[i] / average_length
+                )
+                scores[i] += idf * tf * (self.K1 + 1) / (tf + norm)
+
+        ranked = (
+            (-score, (self._docs[i].get('id') or '').lower(), i)
+            for i, score in scores.items()
+        )
+        if limit is None:
+            ranked = sorted(ranked)
+        else:
+            ranked = heapq.nsmallest(limit, ranked)
+        return [self._docs[i] for _, _, i in ranked]
+
+
+class LibraryStore:
+    """Mirror of the configured bibliographies in an SQLite database
+
+    Entries are stored as JSON alongside indexed citekey, DOI and year
+    columns. An FTS5 table provides full text search, and a table of each
+    entry's trigrams provides the same fuzzy search as FuzzyIndex. Each
+    file's entries are only replaced when its modification time changes, so
+    large libraries aren't reparsed on every change and never have to be
+    held in memory.
+    """
+
+    SCHEMA_VERSION = 2
+    SEARCH_COLUMNS = (
+        'citekey', 'surnames', 'title', 'author',
+        'journal', 'keywords', 'abstract', 'year'
+    )
+    # bm25() weights for full text searches, in column order
+    FULLTEXT_WEIGHTS = (0.0, 0.0, 3.0, 2.0, 1.0, 2.0, 1.0, 0.0)
+
+    def __init__(self, db_path):
+        if not os.path.isdir(os.path.dirname(db_path)):
+            os.makedirs(os.path.dirname(db_path))
+        self._db_path = db_path
+        # Writers are serialized, readers use their own connection and never
+        # wait for a write to finish
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._connections = []
+        self._create_schema()
+
+    @property
+    def _conn(self):
+        """This thread's connection to the database"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self._db_path,
+                timeout=10,
+                check_same_thread=False
+            )
+            # In WAL mode readers see the last committed state during writes
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+            if version != self.SCHEMA_VERSION:
+                self._conn.executescript('''
+                    DROP TABLE IF EXISTS files;
+                    DROP TABLE IF EXISTS entries;
+                    DROP TABLE IF EXISTS entries_fts;
+                    DROP TABLE IF EXISTS entry_trigrams;
+                ''')
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    mtime REAL
+                );
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    citekey TEXT,
+                    citekey_lower TEXT,
+                    doi TEXT,
+                    year TEXT,
+                    grams INTEGER NOT NULL,
+                    fields TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS entries_path
+                    ON entries (path, position);
+                CREATE INDEX IF NOT EXISTS entries_citekey
+                    ON entries (citekey_lower);
+                CREATE INDEX IF NOT EXISTS entries_doi ON entries (doi);
+                CREATE INDEX IF NOT EXISTS entries_year ON entries (year);
+                CREATE TABLE IF NOT EXISTS entry_trigrams (
+                    gram TEXT NOT NULL,
+                    entry INTEGER NOT NULL,
+                    PRIMARY KEY (gram, entry)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS entry_trigrams_entry
+                    ON entry_trigrams (entry);
+                CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+                    citekey, surnames, title, author,
+                    journal, keywords, abstract, year
+                );
+            ''')
+            self._conn.execute(
+                'PRAGMA user_version = %d' % self.SCHEMA_VERSION
+            )
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def mtime(self, path):
+        row = self._conn.execute(
+            'SELECT mtime FROM files WHERE path = ?', (path,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_mtime(self, path, mtime):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO files (path, mtime) VALUES (?, ?)',
+                (path, mtime)
+            )
+
+    def sync(self, paths):
+        """Bring the database in line with the files at paths
+
+        Returns whether anything changed.
+        """
+        known = dict(self._conn.execute('SELECT path, mtime FROM files'))
+        stale = []
+        for path in paths:
+            if Path(path).exists():
+                mtime = os.path.getmtime(path)
+            else:
+                mtime = None
+            if path not in known or known[path] != mtime:
+                stale.append((path, mtime))
+        if not stale:
+            return False
+
+        # Parse outside the lock, the files are written in one go below
+        parsed = load_bibfiles([path for path, _ in stale])
+        with self._lock, self._conn:
+            for (path, mtime), docs in zip(stale, parsed):
+                self._remove_file(path)
+                for position, doc in enumerate(docs):
+                    self._insert(path, position, doc)
+                self._conn.execute(
+                    'INSERT INTO files (path, mtime) VALUES (?, ?)',
+                    (path, mtime)
+                )
+        return True
+
+    def prune(self, paths):
+        """Remove every file that isn't in paths"""
+        with self._lock, self._conn:
+            known = [path for path, in self._conn.execute(
+                'SELECT path FROM files'
+            )]
+            for path in set(known) - set(paths):
+                self._remove_file(path)
+
+    def _remove_file(self, path):
+        self._conn.execute(
+            'DELETE FROM entries_fts WHERE rowid IN '
+            '(SELECT id FROM entries WHERE path = ?)',
+            (path,)
+        )
+        self._conn.execute(
+            'DELETE FROM entry_trigrams WHERE entry IN '
+            '(SELECT id FROM entries WHERE path = ?)',
+            (path,)
+        )
+        self._conn.execute('DELETE FROM entries WHERE path = ?', (path,))
+        self._conn.execute('DELETE FROM files WHERE path = ?', (path,))
+
+    def _insert(self, path, position, doc):
+        citekey = doc.get('id')
+        grams = FuzzyIndex.trigrams(FuzzyIndex.doc_text(doc))
+        cursor = self._conn.execute(
+            'INSERT INTO entries '
+            '(path, position, citekey, citekey_lower, doi, year, grams, '
+            'fields) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                path,
+                position,
+                citekey,
+                citekey.lower() if citekey else None,
+                (doc.get('doi') or '').lower() or None,
+                doc.get('year'),
+                len(grams),
+                json.dumps(doc)
+            )
+        )
+        self._conn.executemany(
+            'INSERT INTO entry_trigrams (gram, entry) VALUES (?, ?)',
+            [(gram, cursor.lastrowid) for gram in grams]
+        )
+        self._conn.execute(
+            'INSERT INTO entries_fts (rowid, {}) VALUES ({})'.format(
+                ', '.join(self.SEARCH_COLUMNS),
+                ', '.join('?' * (len(self.SEARCH_COLUMNS) + 1))
+            ),
+            (
+                cursor.lastrowid,
+                citekey or '',
+                ' '.join(author_surnames(doc.get('author') or '')),
+                strip_latex(doc.get('title') or ''),
+                strip_latex(doc.get('author') or ''),
+                strip_latex(doc.get('journal') or doc.get('booktitle') or ''),
+                strip_latex(doc.get('keywords') or doc.get('keyword') or ''),
+                strip_latex(doc.get('abstract') or ''),
+                doc.get('year') or ''
+            )
+        )
+
+    def add(self, paths, path, doc):
+        """Add an entry appended to the end of path
+
+        Returns the position of the new entry in the library made of paths.
+        """
+        with self._lock, self._conn:
+            position = self._conn.execute(
+                'SELECT COALESCE(MAX(position) + 1, 0) FROM entries '
+                'WHERE path = ?',
+                (path,)
+            ).fetchone()[0]
+            self._insert(path, position, doc)
+
+            earlier = paths[:paths.index(path)]
+            if earlier:
+                position += self._conn.execute(
+                    'SELECT COUNT(*) FROM entries WHERE path IN ({})'.format(
+                        ', '.join('?' * len(earlier))
+                    ),
+                    earlier
+                ).fetchone()[0]
+        return position
+
+    def documents(self, paths):
+        docs = []
+        for path in paths:
+            docs += [
+                json.loads(fields)
+                for fields, in self._conn.execute(
+                    'SELECT fields FROM entries WHERE path = ? '
+                    'ORDER BY position',
+                    (path,)
+                )
+            ]
+        return docs
+
+    def citekeys(self, paths):
+        keys = []
+        for path in paths:
+            keys += [
+                citekey
+                for citekey, in self._conn.execute(
+                    'SELECT citekey FROM entries WHERE path = ? '
+                    'ORDER BY position',
+                    (path,)
+                )
+            ]
+        return keys
+
+    @staticmethod
+    def _in_paths(paths):
+        """SQL condition restricting entries to the files at paths"""
+        return 'entries.path IN (%s)' % ', '.join('?' * len(paths))
+
+    def complete(self, paths, search, limit=None):
+        """Citekeys containing search, in the same order as CitekeyIndex"""
+        search = search.lower()
+        limit = -1 if limit is None else limit
+        results = [
+            citekey
+            for citekey, in self._conn.execute(
+                'SELECT citekey FROM entries '
+                'WHERE citekey_lower >= ? AND citekey_lower < ? AND '
+                + self._in_paths(paths) +
+                ' ORDER BY citekey_lower, citekey LIMIT ?',
+                [search, search + '\uffff'] + list(paths) + [limit]
+            )
+        ]
+        if search and (limit < 0 or len(results) < limit):
+            results += [
+                citekey
+                for citekey, in self._conn.execute(
+                    'SELECT citekey FROM entries '
+                    'WHERE instr(citekey_lower, ?) > 1 AND '
+                    + self._in_paths(paths) +
+                    ' ORDER BY instr(citekey_lower, ?), length(citekey), '
+                    'citekey_lower, citekey LIMIT ?',
+                    [search] + list(paths) + [search, limit - len(results)]
+                )
+            ]
+        return results
+
+    def _search(self, paths, match, weights, limit):
+        return [
+            json.loads(fields)
+            for fields, in self._conn.execute(
+                'SELECT entries.fields FROM entries_fts '
+                'JOIN entries ON entries.id = entries_fts.rowid '
+                'WHERE entries_fts MATCH ? AND {} '
+                'ORDER BY bm25(entries_fts, {}) LIMIT ?'.format(
+                    self._in_paths(paths),
+                    ', '.join(str(w) for w in weights)
+                ),
+                [match] + list(paths) + [-1 if limit is None else limit]
+            )
+        ]
+
+    def fuzzy_search(self, paths, query, limit=None, threshold=0.5):
+        """Entries matching query, best first
+
+        Ranked the same way as FuzzyIndex.search, by the fraction of the
+        query's trigrams each entry shares.
+        """
+        grams = sorted(FuzzyIndex.trigrams(query))
+        if not grams:
+            return []
+        return [
+            json.loads(fields)
+            for fields, in self._conn.execute(
+                'SELECT entries.fields FROM ('
+                '    SELECT entry, COUNT(*) AS shared FROM entry_trigrams '
+                '    WHERE gram IN ({}) GROUP BY entry'
+                ') AS matches JOIN entries ON entries.id = matches.entry '
+                'WHERE matches.shared >= ? AND {} '
+                'ORDER BY matches.shared DESC, entries.grams, '
+                'entries.citekey_lower, entries.id '
+                'LIMIT ?'.format(
+                    ', '.join('?' * len(grams)),
+                    self._in_paths(paths)
+                ),
+                grams + [threshold * len(grams)] + list(paths)
+                + [-1 if limit is None else limit]
+            )
+        ]
+
+    def search(self, paths, query, limit=None):
+        """Entries containing any word of query, best BM25 score first"""
+        words = normalize_text(query).split()
+        if not words:
+            return []
+        match = '{title author journal keywords abstract} : (%s)' % (
+            ' OR '.join('"%s"' % word for word in words)
+        )
+        return self._search(paths, match, self.FULLTEXT_WEIGHTS, limit)
+
+
+class HTTPCache(object):
+    """Persistent cache of HTTP responses in front of a requests.Session
+
+    Used in place of the session itself. Successful responses to requests
+    whose URL matches HTTP_CACHE_TTLS are stored in an SQLite database,
+    keyed by method, URL with sorted parameters and body, and served from
+    there until their TTL runs out. Stale responses with an ETag or
+    Last-Modified header are revalidated with a conditional request. The
+    least recently used responses are dropped to keep the database under
+    max_size bytes.
+    """
+
+    SCHEMA_VERSION = 1
+    # Headers that describe the body as it was sent, not as it's stored
+    SKIPPED_HEADERS = (
+        'content-encoding',
+        'content-length',
+        'transfer-encoding',
+    )
+
+    def __init__(self, session, db_path, max_size):
+        if not os.path.isdir(os.path.dirname(db_path)):
+            os.makedirs(os.path.dirname(db_path))
+        self.session = session
+        self.max_size = max_size
+        self._ttls = [(re.compile(url), ttl) for url, ttl in HTTP_CACHE_TTLS]
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            db_path,
+            timeout=10,
+            check_same_thread=False
+        )
+        with self._lock, self._conn:
+            version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+            if version != self.SCHEMA_VERSION:
+                self._conn.execute('DROP TABLE IF EXISTS responses')
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    url TEXT,
+                    status INTEGER,
+                    headers TEXT,
+                    body BLOB,
+                    stored REAL,
+                    used REAL,
+                    size INTEGER
+                );
+                CREATE INDEX IF NOT EXISTS responses_used ON responses (used);
+            ''')
+            self._conn.execute(
+                'PRAGMA user_version = {}'.format(self.SCHEMA_VERSION)
+            )
+
+    def __getattr__(self, name):
+        # Everything but get and post goes straight to the session
+        return getattr(self.session, name)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get(self, url, params=None, **kwargs):
+        return self.request('GET', url, params=params, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request('POST', url, data=data, **kwargs)
+
+    def ttl(self, url):
+        for pattern, ttl in self._ttls:
+            if pattern.match(url):
+                return ttl
+        return None
+
+    def key(self, method, url, params=None, data=None):
+        import requests
+        prepared = requests.Request(
+            method,
+            url,
+            params=params,
+            data=data
+        ).prepare()
+        scheme, netloc, path, query, _ = urlsplit(prepared.url)
+        query = urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+        body = prepared.body or b''
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        return hashlib.sha1(
+            ' '.join([
+                method,
+                urlunsplit((scheme, netloc, path, query, ''))
+            ]).encode('utf-8')
+            + b'\n'
+            + body
+        ).hexdigest()
+
+    def request(self, method, url, params=None, data=None, headers=None,
+                **kwargs):
+        ttl = self.ttl(url)
+        if ttl is None:
+            return self.session.request(
+                method,
+                url,
+                params=params,
+                data=data,
+                headers=headers,
+                **kwargs
+            )
+
+        key = self.key(method, url, params, data)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT url, status, headers, body, stored FROM responses '
+                'WHERE key = ?',
+                (key,)
+            ).fetchone()
+        now = time.time()
+        if row is not None and now - row[4] < ttl:
+            self._touch(key, now, refresh=False)
+            return self._response(*row[:4])
+
+        headers = dict(headers or {})
+        if row is not None:
+            # Ask the server whether the stored response is still good
+            stored_headers = json.loads(row[2])
+            if 'etag' in stored_headers:
+                headers['If-None-Match'] = stored_headers['etag']
+            if 'last-modified' in stored_headers:
+                headers['If-Modified-Since'] = stored_headers['last-modified']
+
+        response = self.session.request(
+            method,
+            url,
+            params=params,
+            data=data,
+            headers=headers,
+            **kwargs
+        )
+        if response.status_code == 304 and row is not None:
+            self._touch(key, now, refresh=True)
+            return self._response(*row[:4])
+        if response.status_code == 200:
+            self._store(key, response, now)
+        return response
+
+    def _response(self, url, status, headers, body):
+        import requests
+        response = requests.models.Response()
+        response.url = url
+        response.status_code = status
+        response.reason = 'OK'
+        response.headers = requests.structures.CaseInsensitiveDict(
+            json.loads(headers)
+        )
+        response.encoding = requests.utils.get_encoding_from_headers(
+            response.headers
+        )
+        response._content = body
+        return response
+
+    def _touch(self, key, now, refresh):
+        with self._lock, self._conn:
+            if refresh:
+                self._conn.execute(
+                    'UPDATE responses SET stored = ?, used = ? WHERE key = ?',
+                    (now, now, key)
+                )
+            else:
+                self._conn.execute(
+                    'UPDATE responses SET used = ? WHERE key = ?',
+                    (now, key)
+                )
+
+    def _store(self, key, response, now):
+        body = response.content
+        headers = json.dumps(dict(
+            (name.lower(), value)
+            for name, value in response.headers.items()
+            if name.lower() not in self.SKIPPED_HEADERS
+        ))
+        size = len(body) + len(headers)
+        if size > self.max_size:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses '
+                '(key, url, status, headers, body, stored, used, size) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, response.url, response.status_code, headers,
+                 sqlite3.Binary(body), now, now, size)
+            )
+            total = self._conn.execute(
+                'SELECT TOTAL(size) FROM responses'
+            ).fetchone()[0]
+            # Drop the least recently used responses until it fits
+            for old_key, old_size in self._conn.execute(
+                'SELECT key, size FROM responses ORDER BY used'
+            ).fetchall():
+                if total <= self.max_size:
+                    break
+                self._conn.execute(
+                    'DELETE FROM responses WHERE key = ?',
+                    (old_key,)
+                )
+                total -= old_size
+
+
+def _insert(items, position, item):
+    return items[:position] + (item,) + items[position:]
+
+
+class LibrarySnapshot(object):
+    """An immutable view of the library and everything derived from it
+
+    Snapshots are never modified once built. Changes make a new snapshot
+    which is published by rebinding Library.snapshot, so readers never need
+    a lock and never see a half-built cache.
+
+    When the library lives in the SQLite store, a snapshot only carries the
+    generation, file identities and quick panel caches.
+    """
+
+    __slots__ = (
+        'generation', 'files', 'documents_by_path', 'documents',
+        'citekeys', 'citekey_index', 'fuzzy_index', 'fulltext_index',
+        'search_generation', 'rows', 'rows_format', 'menu', 'menu_format'
+    )
+
+    def __init__(
+        self, generation=0, files=(), documents_by_path=None, store=False,
+        citekey_index=None, fuzzy_index=None, fulltext_index=None,
+        search_generation=None, rows=None, rows_format=None,
+        menu=None, menu_format=None
+    ):
+        if documents_by_path is None and not store:
+            documents_by_path = OrderedDict()
+        self.generation = generation
+        self.files = files
+        self.documents_by_path = documents_by_path
+        if documents_by_path is None:
+            self.documents = ()
+        else:
+            self.documents = tuple(
+                doc
+                for docs in documents_by_path.values()
+                for doc in docs
+            )
+        self.citekeys = tuple(doc.get('id') for doc in self.documents)
+        if citekey_index is None:
+            citekey_index = CitekeyIndex(self.citekeys)
+        self.citekey_index = citekey_index
+        self.fuzzy_index = fuzzy_index
+        self.fulltext_index = fulltext_index
+        self.search_generation = search_generation
+        self.rows = rows
+        self.rows_format = rows_format
+        self.menu = menu
+        self.menu_format = menu_format
+
+    @classmethod
+    def load(cls, files):
+        """Parse every bibliography in files, a sequence of (path, identity)
+        """
+        return cls(
+            files=files,
+            documents_by_path=OrderedDict(zip(
+                [path for path, _ in files],
+                parse_bibfiles(files)
+            ))
+        )
+
+    def replace(self, **changes):
+        """A copy of this snapshot with some attributes replaced"""
+        new = object.__new__(LibrarySnapshot)
+        for name in self.__slots__:
+            setattr(new, name, changes.get(name, getattr(self, name)))
+        return new
+
+    def with_document(self, path, doc, position=None):
+        """A snapshot with doc appended to path
+
+        position is the entry's place in the whole library, which must be
+        given when the library is in the store.
+        """
+        changes = {'generation': self.generation + 1}
+
+        if self.documents_by_path is not None:
+            # Entries from path sit after those of every earlier file
+            documents_by_path = OrderedDict(self.documents_by_path)
+            position = 0
+            for single_path, docs in documents_by_path.items():
+                position += len(docs)
+                if single_path == path:
+                    documents_by_path[single_path] = docs + (doc,)
+                    break
+            changes['documents_by_path'] = documents_by_path
+            changes['documents'] = _insert(self.documents, position, doc)
+            changes['citekeys'] = _insert(
+                self.citekeys,
+                position,
+                doc.get('id')
+            )
+            changes['citekey_index'] = self.citekey_index.added(doc.get('id'))
+
+        if self.rows is not None:
+            keys, rows = self.rows
+            changes['rows'] = (
+                _insert(keys, position, doc.get('id')),
+                _insert(rows, position, quickview_row(doc, self.rows_format))
+            )
+        if self.menu is not None:
+            menu = list(self.menu)
+            bisect.insort(menu, _make_citekey_menu_entry(doc, self.menu_format))
+            changes['menu'] = tuple(menu)
+
+        if self.fuzzy_index is not None:
+            changes['fuzzy_index'] = self.fuzzy_index.added(doc)
+        if self.fulltext_index is not None:
+            changes['fulltext_index'] = self.fulltext_index.added(doc)
+        if self.search_generation == self.generation:
+            # Otherwise the indexes are still stale, and a rebuild for the
+            # new generation follows the one in progress
+            changes['search_generation'] = changes['generation']
+        return self.replace(**changes)
+
+
+def _library_documents(library):
+    if _LIBRARY_STORE is not None:
+        return _LIBRARY_STORE.documents(library.paths)
+    return library.snapshot.documents
+
+
 def documents():
-    refresh_caches()
-    return _DOCUMENTS
+    library = refresh_caches()
+    if library is None:
+        return ()
+    return _library_documents(library)
 
 
 def citekeys_menu():
-    refresh_caches()
-    return _MENU
+    library = refresh_caches()
+    if library is None:
+        return ()
+    snapshot = library.snapshot
+    if snapshot.menu is None or snapshot.menu_format != QUICKVIEW_FORMAT:
+        menu = tuple(_make_citekey_menu_list(
+            _library_documents(library),
+            QUICKVIEW_FORMAT
+        ))
+        snapshot = snapshot.replace(menu=menu, menu_format=QUICKVIEW_FORMAT)
+        library.snapshot = snapshot
+    return snapshot.menu
 
 
 def citekeys_list():
-    refresh_caches()
-    return _CITEKEYS
+    library = refresh_caches()
+    if library is None:
+        return ()
+    if _LIBRARY_STORE is not None:
+        return _LIBRARY_STORE.citekeys(library.paths)
+    return library.snapshot.citekeys
+
+
+def complete_citekeys(search, limit=None, view=None):
+    """Citekeys containing search, prefix matches first"""
+    library = refresh_caches(view)
+    if library is None:
+        return []
+    if _LIBRARY_STORE is not None:
+        return _LIBRARY_STORE.complete(library.paths, search, limit)
+    return library.snapshot.citekey_index.complete(search, limit)
+
+
+def library_search(query, limit=None):
+    """Full text search of the library, or nothing if the index isn't built
+    yet
+    """
+    library = refresh_caches()
+    if library is None:
+        return []
+    if _LIBRARY_STORE is not None:
+        return _LIBRARY_STORE.search(library.paths, query, limit)
+    index = library.snapshot.fulltext_index
+    if index is None:
+        return []
+    return index.search(query, limit)
+
+
+def fuzzy_search(query, limit=None, view=None):
+    """Fuzzy search of the library, or nothing if the index isn't built yet
+    """
+    library = refresh_caches(view)
+    if library is None:
+        return []
+    if _LIBRARY_STORE is not None:
+        return _LIBRARY_STORE.fuzzy_search(library.paths, query, limit)
+    index = library.snapshot.fuzzy_index
+    if index is None:
+        return []
+    return index.search(query, limit)
+
+
+def quickview_row(doc, quickview_format=None):
+    """Quick panel row for a library entry, formatted with quickview_format
+    or QUICKVIEW_FORMAT
+    """
+    return (quickview_format or QUICKVIEW_FORMAT).format(
+        citekey=doc.get('id'),
+        title=strip_latex(doc.get('title')),
+        author=strip_latex(doc.get('author')),
+        year=strip_latex(doc.get('year')),
+        journal=strip_latex(doc.get('journal'))
+    ).splitlines()
+
+
+def quickview_rows():
+    """Citekeys and quick panel rows of the whole library, in library order
+
+    Formatting every row is slow for large libraries, so they are cached in
+    the library snapshot for the current quickview_format.
+    """
+    library = refresh_caches()
+    if library is None:
+        return ((), ())
+    snapshot = library.snapshot
+    if snapshot.rows is None or snapshot.rows_format != QUICKVIEW_FORMAT:
+        docs = _library_documents(library)
+        rows = (
+            tuple(doc.get('id') for doc in docs),
+            tuple(quickview_row(doc, QUICKVIEW_FORMAT) for doc in docs)
+        )
+        snapshot = snapshot.replace(rows=rows, rows_format=QUICKVIEW_FORMAT)
+        library.snapshot = snapshot
+    return snapshot.rows
 
 
 class CiterSearchCommand(sublime_plugin.TextCommand):
 
     """
     """
-    def search_bibtex(self):
+    def search_bibtex(self, docs=None):
         selected_index = 0
         self.current_results_txt = []
         self.current_results_keys = []
+        if len(self._remote_backends()) > 1:
+            self.current_results_txt.append([
+                "Search everywhere",
+                "Search every online database at once"
+            ])
+            self.current_results_keys.append("&everywhere")
+            self.everywhere_index = selected_index
+            selected_index += 1
         if HABANERO_AVAILABLE:
             self.current_results_txt.append([
                 "Search CrossRef",
@@ -480,19 +2481,14 @@ class CiterSearchCommand(sublime_plugin.TextCommand):
             selected_index += 1
 
         # Generate all the results to search
-        for doc in documents():
-            citekey = doc.get('id')
-
-            txt = QUICKVIEW_FORMAT.format(
-                citekey=citekey,
-                title=strip_latex(doc.get('title')),
-                author=strip_latex(doc.get('author')),
-                year=strip_latex(doc.get('year')),
-                journal=strip_latex(doc.get('journal'))
-            ).splitlines()
-
-            self.current_results_keys.append(citekey)
-            self.current_results_txt.append(txt)
+        if docs is None:
+            keys, rows = quickview_rows()
+            self.current_results_keys += keys
+            self.current_results_txt += rows
+        else:
+            for doc in docs:
+                self.current_results_keys.append(doc.get('id'))
+                self.current_results_txt.append(quickview_row(doc))
 
         self.view.window().show_quick_panel(
             self.current_results_txt,
@@ -500,14 +2496,20 @@ class CiterSearchCommand(sublime_plugin.TextCommand):
             selected_index=selected_index
         )
 
-    def run(self, edit):
-        refresh_settings()
-        self.search_bibtex()
+    citation_format = None
+
+    def run(self, edit, query=None):
+        ensure_settings()
+        self.citation_format = None
+        if query:
+            # Only offer the entries that best match the query
+            self.search_bibtex(fuzzy_search(query, COMPLETIONS_LIMIT))
+        else:
+            self.search_bibtex()
 
     def run_keyonly(self, edit):
-        refresh_settings()
-        global CITATION_FORMAT
-        CITATION_FORMAT = '%s'
+        ensure_settings()
+        self.citation_format = '%s'
         self.search_bibtex()
 
     def is_enabled(self):
@@ -515,7 +2517,7 @@ class CiterSearchCommand(sublime_plugin.TextCommand):
         """
         return True
 
-    def _proc_item(self, item):
+    def _proc_item(self, item, citekeys):
         date = item.get(CROSSREF_DATE_FIELD, {'date-parts': [[None]]})
         year = date['date-parts'][0][0]
         if year is None and item['type'] == 'book-chapter':
@@ -534,8 +2536,8 @@ class CiterSearchCommand(sublime_plugin.TextCommand):
                 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
                 '0123456789-_'
         )
-        citekey_suffix = 'a' if citekey in self.citekeys else ''
-        while citekey + citekey_suffix in self.citekeys:
+        citekey_suffix = 'a' if citekey in citekeys else ''
+        while citekey + citekey_suffix in citekeys:
             citekey_suffix = chr(ord(citekey_suffix) + 1)
         citekey = citekey + citekey_suffix
         item['citekey'] = citekey
@@ -555,48 +2557,121 @@ class CiterSearchCommand(sublime_plugin.TextCommand):
         txt = txt.splitlines()
         return (citekey, txt, item)
 
-    def _query_crossref(self, query):
-        x = _CROSSREF.works(
-            query=query,
-            limit=CROSSREF_LIMIT,
-            filter={'type': ['journal-article', 'book-chapter']},
-            select=[
-                'title', 'author', CROSSREF_DATE_FIELD, 'type', 'volume', 'page',
-                'issue', 'DOI', 'container-title', 'editor', 'publisher'
-            ]
-        )
-        self.current_results_items = x['message']['items']
+    def _remote_backends(self):
+        """The available online databases by name
 
-        docs = documents()
+        Each has a function that queries it, one that turns the results into
+        (key, txt, data, doi) rows, and one that adds the entry of a row to
+        the bibliography.
+        """
+        backends = OrderedDict()
+        if HABANERO_AVAILABLE:
+            backends["CrossRef"] = (
+                self._fetch_crossref,
+                self._proc_crossref,
+                self._paste_crossref
+            )
+        if PUBMED_AVAILABLE:
+            backends["PubMed"] = (
+                self._fetch_pubmed,
+                self._proc_pubmed,
+                self._paste_pubmed
+            )
+        if CHEMRXIV_AVAILABLE:
+            backends["ChemRxiv"] = (
+                self._fetch_chemrxiv,
+                self._proc_chemrxiv_results,
+                self._paste_chemrxiv
+            )
+        return backends
 
-        self.citekeys = set([doc.get('id') for doc in docs])
+    def _query_crossref(self, query):
+        self._query_remote(["CrossRef"], query)
 
-        if not self.current_results_items:
-            sublime.status_message("CrossRef query gave no results")
-            return
+    def _query_pubmed(self, query):
+        self._query_remote(["PubMed"], query)
 
-        self.current_results_keys, self.current_results_txt, items = zip(*[
-            self._proc_item(item)
-            for item in self.current_results_items
-            # Skip entries without authors, and date for journal articles
-            if 'author' in item and (item['type'] == 'book-chapter' or (
-                CROSSREF_DATE_FIELD in item
-                and item[CROSSREF_DATE_FIELD] != {'date-parts': [[None]]}
-            ))
-        ])
-        self.current_results_items = items
+    def _query_chemrxiv(self, query):
+        self._query_remote(["ChemRxiv"], query)
+
+    def _query_everywhere(self, query):
+        self._query_remote(list(self._remote_backends()), query)
+
+    def _remote_search(self, names, query, on_done, on_batch=None):
+        """Query the backends in names in the background"""
+        backends = self._remote_backends()
+        self._search = FederatedSearch(
+            names[0] if len(names) == 1 else "everywhere",
+            [
+                (name, functools.partial(
+                    remote_fetch,
+                    name,
+                    backends[name][0],
+                    query
+                ))
+                for name in names
+            ],
+            on_done,
+            on_batch
+        ).start()
+
+    def _query_remote(self, names, query):
+        self._live_query = None
+        self.view.hide_popup()
 
-        self.view.window().show_quick_panel(
-            self.current_results_txt,
-            self._paste_crossref
+        self.current_results_keys = []
+        self.current_results_txt = []
+        # The paste function of each entry finds its data by index
+        self.current_results_items = self.current_results_pmart = []
+        self.current_results_pasters = []
+        self._remote_dois = set()
+        self._remote_citekeys = set(citekeys_list())
+        self._remote_tagged = len(names) > 1
+        self._highlighted = 0
+
+        self._remote_search(
+            names,
+            query,
+            self._finish_remote,
+            self._extend_remote
         )
 
-        self.citekeys = None
+    def _fetch_crossref(self, query):
+        for offset, limit in remote_batches(CROSSREF_LIMIT):
+            x = crossref_client().works(
+                query=query,
+                limit=limit,
+                offset=offset,
+                filter={'type': ['journal-article', 'book-chapter']},
+                select=[
+                    'title', 'author', CROSSREF_DATE_FIELD, 'type', 'volume',
+                    'page', 'issue', 'DOI', 'container-title', 'editor',
+                    'publisher'
+                ]
+            )
+            items = x['message']['items']
+            yield [
+                item
+                for item in items
+                # Skip entries without authors, and date for journal articles
+                if 'author' in item and (item['type'] == 'book-chapter' or (
+                    CROSSREF_DATE_FIELD in item
+                    and item[CROSSREF_DATE_FIELD] != {'date-parts': [[None]]}
+                ))
+            ]
+            if len(items) < limit:
+                return
+
+    def _proc_crossref(self, items, citekeys):
+        return [
+            self._proc_item(item, citekeys) + (item.get('DOI'),)
+            for item in items
+        ]
 
-    def _proc_pmart(self, pubmedarticle):
+    def _proc_pmart(self, pubmedarticle, citekeys):
         pubdate = pubmedarticle.publication_date
         if isinstance(pubdate, str):
-            pubdate = dateutil.parser.parse(pubdate)
+            pubdate = parse_date(pubdate)
         year = pubdate.year
 
         citekey = (
@@ -612,8 +2687,8 @@ class CiterSearchCommand(sublime_plugin.TextCommand):
                 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
                 '0123456789-_'
         )
-        citekey_suffix = 'a' if citekey in self.citekeys else ''
-        while citekey + citekey_suffix in self.citekeys:
+        citekey_suffix = 'a' if citekey in citekeys else ''
+        while citekey + citekey_suffix in citekeys:
             citekey_suffix = chr(ord(citekey_suffix) + 1)
         citekey = citekey + citekey_suffix
 
@@ -643,7 +2718,7 @@ class CiterSearchCommand(sublime_plugin.TextCommand):
 
     def _proc_chemrxiv(self, article):
         pubdate = article["published_date"]
-        pubdate = dateutil.parser.parse(pubdate)
+        pubdate = parse_date(pubdate)
         year = pubdate.year
 
         citekey = article["id"]
@@ -658,33 +2733,26 @@ class CiterSearchCommand(sublime_plugin.TextCommand):
 
         return (citekey, txt)
 
-    def _query_pubmed(self, query):
-        self.current_results_pmart = list(_PUBMED.query(
-            query,
+    def _fetch_pubmed(self, query):
+        client = pubmed_client()
+        article_ids = client._getArticleIds(
+            query=query,
             max_results=PUBMED_LIMIT
-        ))
-
-        docs = documents()
-        self.citekeys = set([doc.get('id') for doc in docs])
-
-        if not self.current_results_pmart:
-            sublime.status_message("PubMed query gave no results")
-            return
-
-        self.current_results_keys, self.current_results_txt = zip(
-            *[self._proc_pmart(pmart) for pmart in self.current_results_pmart]
-        )
-
-        self.view.window().show_quick_panel(
-            self.current_results_txt,
-            self._paste_pubmed
         )
+        for offset, size in remote_batches(len(article_ids)):
+            yield list(client._getArticles(
+                article_ids=article_ids[offset:offset + size]
+            ))
 
-        self.citekeys = None
+    def _proc_pubmed(self, pmarts, citekeys):
+        return [
+            self._proc_pmart(pmart, citekeys) + (pmart, pmart.doi)
+            for pmart in pmarts
+        ]
 
-    def _query_chemrxiv(self, query):
-        r = requests.post(
-            "https://api.figshare.com/v2/articles/search",
+    def _fetch_chemrxiv(self, query):
+        r = http_session().post(
+            FIGSHARE_URL + "/v2/articles/search",
             data=json.dumps({
                 "item_type": 12, # Preprint
                 "search_for": query
@@ -693,31 +2761,148 @@ class CiterSearchCommand(sublime_plugin.TextCommand):
 
         r.raise_for_status()
 
-        current_results_chemrxiv = r.json()
+        yield r.json()
 
-        if not current_results_chemrxiv:
-            sublime.status_message("ChemRxiv query gave no results")
-            return
+    def _proc_chemrxiv_results(self, articles, citekeys):
+        return [
+            self._proc_chemrxiv(article) + (article, article.get('doi'))
+            for article in articles
+        ]
 
-        self.current_results_keys, self.current_results_txt = map(list, zip(
-            *[self._proc_chemrxiv(a) for a in current_results_chemrxiv]
-        ))
+    def _remote_rows(self, results, dois, citekeys, tagged):
+        """Rows for the (name, results) pairs of each backend, with their
+        paste functions
+
+        Entries whose DOI is in dois, already found by an earlier backend or
+        batch, are left out, and the DOIs of the rest are added to it.
+        """
+        backends = self._remote_backends()
+        rows = []
+        for name, source_results in results:
+            _, process, paste = backends[name]
+            for key, txt, data, doi in process(source_results, citekeys):
+                doi = normalize_doi(doi)
+                if doi is not None:
+                    if doi in dois:
+                        continue
+                    dois.add(doi)
+                if tagged:
+                    txt = txt[:-1] + [txt[-1] + ' (' + name + ')']
+                rows.append((key, txt, data, paste))
+        return rows
+
+    def _extend_remote(self, name, batch):
+        """Add a batch of results to the quick panel, opening it again with
+        the same entry selected
+        """
+        rows = self._remote_rows(
+            [(name, batch)],
+            self._remote_dois,
+            self._remote_citekeys,
+            self._remote_tagged
+        )
+        if not rows:
+            return
+        for key, txt, data, paste in rows:
+            self.current_results_keys.append(key)
+            self.current_results_txt.append(txt)
+            self.current_results_items.append(data)
+            self.current_results_pasters.append(paste)
 
+        self._panel_token += 1
         self.view.window().show_quick_panel(
             self.current_results_txt,
-            self._paste_chemrxiv
+            functools.partial(self._paste_remote, self._panel_token),
+            selected_index=self._highlighted,
+            on_highlight=self._highlight_remote
         )
 
+    def _finish_remote(self, results):
+        if results and not self.current_results_keys:
+            sublime.status_message("{} query gave no results".format(
+                ', '.join(name for name, _ in results)
+            ))
+
+    _panel_token = 0
+
+    def _highlight_remote(self, index):
+        self._highlighted = index
+
+    def _paste_remote(self, token, index):
+        # The panel was replaced by one with more results
+        if token != self._panel_token:
+            return
+        # Don't reopen the panel once the user is done with it
+        self._search.cancel()
+        if index == -1:
+            return
+        return self.current_results_pasters[index](index)
+
+    _live_query = None
 
-    def search_external(self, dbname, queryfunc):
+    def search_external(self, dbname, queryfunc, names=()):
+        """Ask for a query and pass it to queryfunc
+
+        While it's typed, the results of the backends in names for what has
+        been typed so far are previewed in a popup.
+        """
+        on_change = None
+        if names and LIVE_SEARCH_DELAY:
+            on_change = functools.partial(self._on_query_change, list(names))
         self.view.window().show_input_panel(
             "Search {dbname}".format(**locals()),
             "",
             on_done=queryfunc,
-            on_change=None,
-            on_cancel=None
+            on_change=on_change,
+            on_cancel=self._cancel_live_search
+        )
+
+    def _on_query_change(self, names, query):
+        self._live_query = query
+        sublime.set_timeout(
+            functools.partial(self._live_search, names, query),
+            LIVE_SEARCH_DELAY
+        )
+
+    def _live_search(self, names, query):
+        # Only search once typing has paused
+        if query != self._live_query:
+            return
+        if len(query.strip()) < LIVE_SEARCH_MIN_LENGTH:
+            self.view.hide_popup()
+            return
+        self._remote_search(
+            names,
+            query,
+            functools.partial(self._preview_remote, query)
         )
 
+    def _preview_remote(self, query, results):
+        if query != self._live_query:
+            return
+        rows = self._remote_rows(
+            results,
+            set(),
+            set(citekeys_list()),
+            len(results) > 1
+        )[:LIVE_SEARCH_PREVIEW]
+        if rows:
+            content = ''.join(
+                '<p>{}</p>'.format('<br>'.join(
+                    html.escape(line) for line in txt
+                ))
+                for _, txt, _, _ in rows
+            )
+        else:
+            content = '<p>No results</p>'
+        self.view.show_popup(content, location=-1, max_width=800)
+
+    def _cancel_live_search(self):
+        self._live_query = None
+        self.view.hide_popup()
+        if _CURRENT_SEARCH is not None:
+            _CURRENT_SEARCH.cancel()
+
     def _paste(self, index):
         """Paste index into buffer
         """
@@ -725,7 +2910,7 @@ class CiterSearchCommand(sublime_plugin.TextCommand):
             return
 
         ent = self.current_results_keys[index]
-        citekey = CITATION_FORMAT % ent
+        citekey = (self.citation_format or CITATION_FORMAT) % ent
         if PANDOC_FIX:
             self.view.run_command('insert', {'characters': citekey})
             self.view.run_command('citer_combine_citations')
@@ -733,12 +2918,31 @@ class CiterSearchCommand(sublime_plugin.TextCommand):
             self.view.run_command('insert', {'characters': citekey})
 
     def _paste_bibtex(self, index):
+        backends = self._remote_backends()
+        if len(backends) > 1 and index == self.everywhere_index:
+            return self.search_external(
+                "everywhere",
+                self._query_everywhere,
+                backends
+            )
         if HABANERO_AVAILABLE and index == self.habanero_index:
-            return self.search_external("CrossRef", self._query_crossref)
+            return self.search_external(
+                "CrossRef",
+                self._query_crossref,
+                ["CrossRef"]
+            )
         if PUBMED_AVAILABLE and index == self.pubmed_index:
-            return self.search_external("PubMed", self._query_pubmed)
+            return self.search_external(
+                "PubMed",
+                self._query_pubmed,
+                ["PubMed"]
+            )
         if CHEMRXIV_AVAILABLE and index == self.chemrxiv_index:
-            return self.search_external("ChemRxiv", self._query_chemrxiv)
+            return self.search_external(
+                "ChemRxiv",
+                self._query_chemrxiv,
+                ["ChemRxiv"]
+            )
 
         return self._paste(index)
 
@@ -777,11 +2981,13 @@ class CiterSearchCommand(sublime_plugin.TextCommand):
         return self._paste(index)
 
     def _paste_pubmed(self, index):
+        from pymed.article import PubMedArticle
+        from pymed.book import PubMedBookArticle
         pmart = self.current_results_pmart[index]
 
         pubdate = pmart.publication_date
         if isinstance(pubdate, str):
-            pubdate = dateutil.parser.parse(pubdate)
+            pubdate = parse_date(pubdate)
 
         bibtex_entry = {
             'id': self.current_results_keys[index],
@@ -814,18 +3020,30 @@ class CiterSearchCommand(sublime_plugin.TextCommand):
         return self._paste(index)
 
     def _paste_chemrxiv(self, index):
-        id = self.current_results_keys[index]
+        if index == -1:
+            return
 
-        r = requests.get(
-            "https://api.figshare.com/v2/articles/{id}".format(**locals()),
+        RemoteSearch(
+            "ChemRxiv",
+            functools.partial(
+                self._fetch_chemrxiv_article,
+                self.current_results_keys[index]
+            ),
+            functools.partial(self._add_chemrxiv, index)
+        ).start()
+
+    def _fetch_chemrxiv_article(self, id):
+        r = http_session().get(
+            FIGSHARE_URL + "/v2/articles/{id}".format(**locals()),
         )
 
         r.raise_for_status()
 
-        article = r.json()
+        return r.json()
 
+    def _add_chemrxiv(self, index, article):
         pubdate = article["published_date"]
-        pubdate = dateutil.parser.parse(pubdate)
+        pubdate = parse_date(pubdate)
         year = pubdate.year
 
         citekey = (
@@ -842,8 +3060,7 @@ class CiterSearchCommand(sublime_plugin.TextCommand):
                 '0123456789-_'
         )
 
-        docs = documents()
-        citekeys = set([doc.get('id') for doc in docs])
+        citekeys = set(citekeys_list())
         citekey_suffix = 'a' if citekey in citekeys else ''
         while citekey + citekey_suffix in citekeys:
             citekey_suffix = chr(ord(citekey_suffix) + 1)
@@ -870,12 +3087,58 @@ class CiterSearchCommand(sublime_plugin.TextCommand):
         return self._paste(index)
 
 
+class CiterSearchLibraryCommand(CiterSearchCommand):
+
+    """Full text search of the title, author, journal, keywords and
+    abstract of every entry in the library
+    """
+    def run(self, edit, query=None):
+        ensure_settings()
+        self.citation_format = None
+        if query:
+            self._query_library(query)
+        else:
+            self.view.window().show_input_panel(
+                "Search library",
+                "",
+                on_done=self._query_library,
+                on_change=None,
+                on_cancel=None
+            )
+
+    def _query_library(self, query):
+        docs = library_search(query, LIBRARY_SEARCH_LIMIT)
+        if not docs:
+            sublime.status_message("Library search gave no results")
+            return
+
+        self.current_results_keys = [doc.get('id') for doc in docs]
+        self.current_results_txt = [quickview_row(doc) for doc in docs]
+
+        self.view.window().show_quick_panel(
+            self.current_results_txt,
+            self._paste
+        )
+
+
+class CiterCancelSearchCommand(sublime_plugin.WindowCommand):
+
+    """Drops the remote search in progress"""
+
+    def run(self):
+        if _CURRENT_SEARCH is not None:
+            _CURRENT_SEARCH.cancel("Citer search cancelled")
+
+    def is_enabled(self):
+        return _CURRENT_SEARCH is not None
+
+
 class CiterCompleteCitationEventListener(sublime_plugin.EventListener):
 
     """docstring for CiterCompleteCitationEventListener"""
 
     def on_query_completions(self, view, prefix, loc):
-        refresh_settings()
+        ensure_settings()
         in_scope = any(
             view.match_selector(loc[0], scope)
             for scope in COMPLETIONS_SCOPES
@@ -896,26 +3159,70 @@ class CiterCompleteCitationEventListener(sublime_plugin.EventListener):
                     searcher = CiterSearchCommand(view)
                     searcher.run_keyonly(None)
             else:
-                load_yamlbib_path(view)
-
                 search = prefix.replace('@', '').lower()
 
                 results = [
                     [key, key]
-                    for key in citekeys_list()
-                    if search in key.lower()
+                    for key in complete_citekeys(
+                        search,
+                        COMPLETIONS_LIMIT,
+                        view=view
+                    )
                 ]
 
+                # Fill up with entries whose author, title or year match
+                if search and len(results) < COMPLETIONS_LIMIT:
+                    seen = set(key for key, _ in results)
+                    for doc in fuzzy_search(search, COMPLETIONS_LIMIT, view):
+                        key = doc.get('id')
+                        if key in seen or len(results) >= COMPLETIONS_LIMIT:
+                            continue
+                        seen.add(key)
+                        # The trigger includes the matched text so that
+                        # Sublime's own filtering doesn't hide the entry
+                        trigger = condense_whitespace(' '.join([
+                            key,
+                            ' '.join(author_surnames(doc.get('author') or '')),
+                            strip_latex(doc.get('title') or '')
+                        ]))
+                        results.append([
+                            trigger + '\t' + str(doc.get('year') or ''),
+                            key
+                        ])
+
                 if EXCLUDE and len(results) > 0:
                     return (results, sublime.INHIBIT_WORD_COMPLETIONS)
                 else:
                     return results
 
+    def on_close(self, view):
+        forget_paper(view)
+
+
+class CiterSettingsEventListener(sublime_plugin.EventListener):
+
+    """Invalidates a window's cached settings when its project changes"""
+
+    def on_post_save(self, view):
+        window = view.window()
+        if window is not None and view.file_name() == window.project_file_name():
+            invalidate_settings(window)
+
+    def on_load_project(self, window):
+        invalidate_settings(window)
+
+    def on_post_save_project(self, window):
+        invalidate_settings(window)
+
+    def on_pre_close_window(self, window):
+        invalidate_settings(window)
+        release_window(window.id())
+
 
 class CiterCombineCitationsCommand(sublime_plugin.TextCommand):
 
     def run(self, edit):
-        refresh_settings()
+        ensure_settings()
         lstpos = self.view.find_all(r'\]\[')
         for i, pos in reversed(list(enumerate(lstpos))):
             self.view.replace(edit, pos, r'; ')
@@ -18,7 +18,10 @@ class PubMed(object):
     """
 
     def __init__(
-        self: object, tool: str = "my_tool", email: str = "my_email@example.com"
+        self: object,
+        tool: str = "my_tool",
+        email: str = "my_email@example.com",
+        session: object = None,
     ) -> None:
         """ Initialization of the object.
 
@@ -28,6 +31,8 @@ class PubMed(object):
                             PMC (PubMed Central).
                 - email     String, email of the user of the tool. This parameter
                             is not required but kindly requested by PMC (PubMed Central).
+                - session   Object to make requests with, such as a requests.Session.
+                            Defaults to the requests module itself.
 
             Returns:
                 - None
@@ -36,6 +41,7 @@ class PubMed(object):
         # Store the input parameters
         self.tool = tool
         self.email = email
+        self.session = session
 
         # Keep track of the rate limit
         self._rateLimit = 3
@@ -133,7 +139,8 @@ class PubMed(object):
         parameters["retmode"] = output
 
         # Make the request to PubMed
-        response = requests.get(str(BASE_URL)+str(url), params=parameters)
+        http = self.session or requests
+        response = http.get(str(BASE_URL)+str(url), params=parameters)
 
         # Check for any errors
         response.raise_for_status()
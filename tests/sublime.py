@@ -0,0 +1,122 @@
+"""Just enough of Sublime Text's sublime module to import jamciter
+
+Callbacks passed to set_timeout and set_timeout_async are queued in
+pending instead of being run; tests run them with run_pending.
+"""
+import tempfile
+
+INHIBIT_WORD_COMPLETIONS = 8
+INHIBIT_EXPLICIT_COMPLETIONS = 16
+
+pending = []
+statuses = []
+
+
+def set_timeout(callback, delay=0):
+    pending.append((callback, delay))
+
+
+set_timeout_async = set_timeout
+
+
+def run_pending():
+    while pending:
+        callback, _ = pending.pop(0)
+        callback()
+
+
+def status_message(message):
+    statuses.append(message)
+
+
+def cache_path():
+    return tempfile.gettempdir()
+
+
+class Settings(dict):
+    def add_on_change(self, key, callback):
+        pass
+
+    def clear_on_change(self, key):
+        pass
+
+
+_SETTINGS = Settings()
+
+
+def load_settings(name):
+    return _SETTINGS
+
+
+class Region(object):
+    def __init__(self, a, b=None):
+        self.a = a
+        self.b = a if b is None else b
+
+    def begin(self):
+        return min(self.a, self.b)
+
+    def end(self):
+        return max(self.a, self.b)
+
+
+class View(object):
+    def __init__(self, text='', file_name=None):
+        self.text = text
+        self._file_name = file_name
+        self.status = {}
+        self.changes = 0
+
+    def change_count(self):
+        return self.changes
+
+    def id(self):
+        return id(self)
+
+    def file_name(self):
+        return self._file_name
+
+    def size(self):
+        return len(self.text)
+
+    def substr(self, region):
+        return self.text[region.begin():region.end()]
+
+    def set_status(self, key, value):
+        self.status[key] = value
+
+    def erase_status(self, key):
+        self.status.pop(key, None)
+
+
+class Window(object):
+    def __init__(self, project_data=None, project_file_name=None):
+        self._project_data = project_data
+        self._project_file_name = project_file_name
+        self._view = View()
+
+    def id(self):
+        return id(self)
+
+    def project_data(self):
+        return self._project_data
+
+    def project_file_name(self):
+        return self._project_file_name
+
+    def active_view(self):
+        return self._view
+
+    def views(self):
+        return [self._view]
+
+
+_WINDOW = Window()
+
+
+def active_window():
+    return _WINDOW
+
+
+def windows():
+    return [_WINDOW]
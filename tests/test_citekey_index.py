@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from jamciter import CitekeyIndex
+
+
+class TestCitekeyIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = CitekeyIndex([
+            'aaaaaaasmith', 'bbsmith', 'csmith2', 'zsmith', 'Smithy', 'x'
+        ])
+
+    def test_prefix_matches_first_ignoring_case(self):
+        self.assertEqual(self.index.complete('SMI')[0], 'Smithy')
+
+    def test_infix_ranked_by_offset_then_length(self):
+        self.assertEqual(
+            self.index.complete('smith'),
+            ['Smithy', 'zsmith', 'csmith2', 'bbsmith', 'aaaaaaasmith']
+        )
+
+    def test_limit_keeps_best_infix_matches(self):
+        self.assertEqual(
+            self.index.complete('smith', 3),
+            ['Smithy', 'zsmith', 'csmith2']
+        )
+
+    def test_prefix_matches_filling_limit_skip_infix_search(self):
+        self.assertEqual(self.index.complete('smith', 1), ['Smithy'])
+        self.assertIsNone(self.index._haystack)
+
+    def test_empty_search_lists_keys_in_order(self):
+        self.assertEqual(
+            self.index.complete('', 2), ['aaaaaaasmith', 'bbsmith']
+        )
+
+    def test_key_listed_once(self):
+        index = CitekeyIndex(['abab'])
+        self.assertEqual(index.complete('b'), ['abab'])
+
+    def test_added_leaves_original_alone(self):
+        added = self.index.added('Asmith')
+        self.assertEqual(len(added), 7)
+        self.assertEqual(len(self.index), 6)
+        self.assertEqual(added.complete('a', 2), ['aaaaaaasmith', 'Asmith'])
+        self.assertNotIn('Asmith', self.index.complete('smith'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import unittest
+
+import sublime
+
+from jamciter import Paper
+
+
+class CountingView(sublime.View):
+    """A view that remembers how much of the buffer was read"""
+
+    read = 0
+
+    def substr(self, region):
+        self.read = max(self.read, region.end())
+        return sublime.View.substr(self, region)
+
+
+def bibpaths(text, file_name='/notes/paper.md'):
+    return Paper(sublime.View(text, file_name))._find_bibpaths()
+
+
+class TestFindBibpaths(unittest.TestCase):
+
+    def test_single_path_relative_to_file(self):
+        self.assertEqual(
+            bibpaths('---\ntitle: x\nbibliography: refs.bib\n---\nText\n'),
+            ['/notes/refs.bib']
+        )
+
+    def test_quotes_and_comments_stripped(self):
+        self.assertEqual(
+            bibpaths('---\nbibliography: "my refs.bib" # main\n---\n'),
+            ['/notes/my refs.bib']
+        )
+
+    def test_flow_sequence(self):
+        self.assertEqual(
+            bibpaths('---\nbibliography: [a.bib, \'b.bib\']\n---\n'),
+            ['/notes/a.bib', '/notes/b.bib']
+        )
+
+    def test_block_sequence(self):
+        self.assertEqual(
+            bibpaths('---\nbibliography:\n  - a.bib\n  - /abs/b.bib\n'
+                     'title: x\n---\n'),
+            ['/notes/a.bib', '/abs/b.bib']
+        )
+
+    def test_home_expanded(self):
+        self.assertEqual(
+            bibpaths('---\nbibliography: ~/refs.bib\n---\n'),
+            [os.path.expanduser('~/refs.bib')]
+        )
+
+    def test_unsaved_view_keeps_relative_path(self):
+        self.assertEqual(
+            bibpaths('---\nbibliography: refs.bib\n---\n', None),
+            ['refs.bib']
+        )
+
+    def test_closing_dots(self):
+        self.assertEqual(
+            bibpaths('---\nbibliography: refs.bib\n...\n'),
+            ['/notes/refs.bib']
+        )
+
+    def test_no_front_matter(self):
+        self.assertEqual(bibpaths('Text\n---\nbibliography: a.bib\n---\n'),
+                         [])
+        self.assertEqual(bibpaths(''), [])
+
+    def test_bibliography_after_front_matter_ignored(self):
+        self.assertEqual(
+            bibpaths('---\ntitle: x\n---\nbibliography: a.bib\n'),
+            []
+        )
+
+    def test_unclosed_front_matter(self):
+        self.assertEqual(bibpaths('---\nbibliography: a.bib\n'), [])
+
+    def test_only_front_matter_read(self):
+        view = CountingView(
+            '---\nbibliography: refs.bib\n---\n' + 'Text\n' * 100000,
+            '/notes/paper.md'
+        )
+        self.assertEqual(Paper(view)._find_bibpaths(), ['/notes/refs.bib'])
+        self.assertEqual(view.read, Paper.HEADER_CHUNK)
+
+    def test_front_matter_spanning_chunks(self):
+        front = '---\n' + 'x: 1\n' * 2000 + 'bibliography: refs.bib\n---\n'
+        self.assertGreater(len(front), Paper.HEADER_CHUNK)
+        view = CountingView(front + 'Text\n' * 100000, '/notes/paper.md')
+        self.assertEqual(Paper(view)._find_bibpaths(), ['/notes/refs.bib'])
+        self.assertLess(view.read, len(front) + Paper.HEADER_CHUNK)
+
+    def test_cached_until_buffer_changes(self):
+        view = sublime.View('---\nbibliography: a.bib\n---\n', '/n/p.md')
+        paper = Paper(view)
+        self.assertEqual(paper.bibpaths(), ['/n/a.bib'])
+        view.text = '---\nbibliography: b.bib\n---\n'
+        self.assertEqual(paper.bibpaths(), ['/n/a.bib'])
+        view.changes += 1
+        self.assertEqual(paper.bibpaths(), ['/n/b.bib'])
+
+
+if __name__ == '__main__':
+    unittest.main()
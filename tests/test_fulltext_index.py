@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from jamciter import FullTextIndex
+
+
+DOCS = [
+    {'id': 'graphs', 'title': 'Graph neural networks',
+     'author': 'Smith, John', 'journal': 'Machine Learning',
+     'abstract': 'We study message passing on molecules.'},
+    {'id': 'proteins', 'title': 'Protein folding with deep learning',
+     'author': 'Jones, Bob', 'keyword': 'proteins, networks',
+     'abstract': 'Neural networks predict structure.'},
+    {'id': 'catalysis', 'title': 'Catalysis at surfaces',
+     'author': 'Müller, Hans', 'booktitle': 'Surface Science',
+     'abstract': 'Graph theory is not used here.'},
+]
+
+
+def ids(docs):
+    return [doc['id'] for doc in docs]
+
+
+class TestFullTextIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = FullTextIndex(DOCS)
+
+    def test_tokenize_normalizes(self):
+        self.assertEqual(
+            FullTextIndex.tokenize('Müller, Graph-Networks!'),
+            ['muller', 'graph', 'networks']
+        )
+
+    def test_frequencies_weighted_by_field(self):
+        frequencies = FullTextIndex.frequencies(DOCS[1])
+        # once in the abstract, once in keywords
+        self.assertEqual(frequencies['networks'], 1 + 2)
+        self.assertEqual(frequencies['protein'], 3)
+        self.assertEqual(frequencies['proteins'], 2)
+
+    def test_title_outranks_abstract(self):
+        self.assertEqual(ids(self.index.search('graph')),
+                         ['graphs', 'catalysis'])
+
+    def test_any_word_matches(self):
+        self.assertEqual(
+            set(ids(self.index.search('catalysis protein'))),
+            {'catalysis', 'proteins'}
+        )
+        self.assertEqual(ids(self.index.search('muller')), ['catalysis'])
+        self.assertEqual(ids(self.index.search('surface science')),
+                         ['catalysis'])
+
+    def test_no_match(self):
+        self.assertEqual(self.index.search('zeolite'), [])
+        self.assertEqual(self.index.search(''), [])
+        self.assertEqual(FullTextIndex().search('graph'), [])
+
+    def test_limit(self):
+        self.assertEqual(self.index.search('networks', 1),
+                         self.index.search('networks')[:1])
+
+    def test_ties_go_to_lower_citekey(self):
+        index = FullTextIndex([dict(DOCS[0], id='b'), dict(DOCS[0], id='a')])
+        self.assertEqual(ids(index.search('graph')), ['a', 'b'])
+
+    def test_added_matches_rebuild(self):
+        new = {'id': 'agraphs', 'title': 'Graph neural networks',
+               'author': 'Doe, Jane', 'abstract': 'Graphs of proteins.'}
+        added = self.index.added(new)
+        # In the library the new entry can sit before older ones
+        rebuilt = FullTextIndex([new] + DOCS)
+        for query in ('graph', 'networks', 'neural proteins', 'smith',
+                      'catalysis surfaces'):
+            for limit in (None, 1, 2):
+                self.assertEqual(
+                    ids(added.search(query, limit)),
+                    ids(rebuilt.search(query, limit)),
+                    (query, limit)
+                )
+        self.assertEqual(len(added), len(DOCS) + 1)
+
+    def test_added_leaves_original_alone(self):
+        self.index.added({'id': 'new', 'title': 'Zeolite'})
+        self.assertEqual(len(self.index), len(DOCS))
+        self.assertEqual(self.index.search('zeolite'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from jamciter import FuzzyIndex
+
+
+DOCS = [
+    {'id': 'smith2020', 'author': 'Smith, John and Doe, Jane',
+     'title': 'Trigram indexes for bibliographies', 'year': '2020'},
+    {'id': 'jones2019', 'author': 'Jones, Bob',
+     'title': 'Searching large libraries', 'year': '2019'},
+    {'id': 'muller2018', 'author': 'Müller, Hans',
+     'title': 'Fuzzy citation search', 'year': '2018'},
+    {'id': 'smyth', 'author': 'Smyth, Ann',
+     'title': 'Trigram indexes for bibliographies', 'year': '2020'},
+]
+
+
+def ids(docs):
+    return [doc['id'] for doc in docs]
+
+
+class TestFuzzyIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = FuzzyIndex(DOCS)
+
+    def test_trigrams_are_padded_per_word(self):
+        self.assertEqual(
+            FuzzyIndex.trigrams('Ab cd'),
+            {' ab', 'ab ', ' cd', 'cd '}
+        )
+
+    def test_finds_word_fragments_and_typos(self):
+        self.assertEqual(ids(self.index.search('searchng libraries')),
+                         ['jones2019'])
+        self.assertEqual(ids(self.index.search('jones')), ['jones2019'])
+
+    def test_finds_accented_names_without_accents(self):
+        self.assertEqual(ids(self.index.search('muller')), ['muller2018'])
+
+    def test_ranked_by_shared_trigrams(self):
+        self.assertEqual(
+            ids(self.index.search('smith trigram')),
+            ['smith2020', 'smyth']
+        )
+
+    def test_threshold_drops_weak_matches(self):
+        self.assertEqual(self.index.search('smith trigram', threshold=0.9),
+                         [self.index.search('smith trigram')[0]])
+        self.assertEqual(self.index.search('zzzz'), [])
+        self.assertEqual(self.index.search(''), [])
+
+    def test_limit(self):
+        self.assertEqual(
+            self.index.search('trigram indexes', 1),
+            self.index.search('trigram indexes')[:1]
+        )
+
+    def test_ties_go_to_lower_citekey(self):
+        index = FuzzyIndex([dict(DOCS[0], id='b'), dict(DOCS[0], id='a')])
+        self.assertEqual(ids(index.search('trigram indexes')), ['a', 'b'])
+
+    def test_added_matches_rebuild(self):
+        new = {'id': 'asmith', 'author': 'Smith, Eve',
+               'title': 'Trigram indexes for bibliographies', 'year': '2020'}
+        added = self.index.added(new)
+        rebuilt = FuzzyIndex(DOCS[:2] + [new] + DOCS[2:])
+        for query in ('smith', 'trigram indexes', 'smith 2020', 'jones',
+                      'muller', 'fuzzy'):
+            for limit in (None, 1, 2):
+                self.assertEqual(
+                    ids(added.search(query, limit)),
+                    ids(rebuilt.search(query, limit)),
+                    (query, limit)
+                )
+        self.assertEqual(len(added), len(DOCS) + 1)
+
+    def test_added_leaves_original_alone(self):
+        self.index.added({'id': 'new', 'title': 'Trigram'})
+        self.assertEqual(len(self.index), len(DOCS))
+        self.assertNotIn('new', ids(self.index.search('trigram')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+
+from jamciter import HTTPCache
+
+
+WORK = 'https://api.crossref.org/works/10.1000/xyz'
+SEARCH = 'https://api.crossref.org/works'
+UNCACHED = 'https://example.org/works'
+
+
+def make_response(url, status=200, body=b'{}', headers=None):
+    response = requests.models.Response()
+    response.url = url
+    response.status_code = status
+    response.headers = requests.structures.CaseInsensitiveDict(headers or {})
+    response._content = body
+    return response
+
+
+class StubSession(object):
+    """Answers every request with the next queued response"""
+
+    def __init__(self):
+        self.responses = []
+        self.requests = []
+
+    def request(self, method, url, params=None, data=None, headers=None,
+                **kwargs):
+        self.requests.append((method, url, params, data, headers or {}))
+        return self.responses.pop(0)
+
+
+class TestHTTPCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.session = StubSession()
+        self.cache = HTTPCache(
+            self.session,
+            os.path.join(self.tmp, 'http', 'cache.db'),
+            1000000
+        )
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tmp)
+
+    def age(self, seconds):
+        with self.cache._conn:
+            self.cache._conn.execute(
+                'UPDATE responses SET stored = stored - ?', (seconds,)
+            )
+
+    def test_key_ignores_parameter_order(self):
+        self.assertEqual(
+            self.cache.key('GET', SEARCH, {'query': 'x', 'rows': 5}),
+            self.cache.key('GET', SEARCH + '?rows=5&query=x')
+        )
+
+    def test_key_depends_on_method_and_body(self):
+        keys = set([
+            self.cache.key('GET', SEARCH, {'query': 'x'}),
+            self.cache.key('GET', SEARCH, {'query': 'y'}),
+            self.cache.key('POST', SEARCH, {'query': 'x'}),
+            self.cache.key('POST', SEARCH, {'query': 'x'}, {'id': '1'}),
+            self.cache.key('POST', SEARCH, {'query': 'x'}, {'id': '2'}),
+        ])
+        self.assertEqual(len(keys), 5)
+
+    def test_ttl_goes_by_first_matching_url(self):
+        self.assertEqual(self.cache.ttl(WORK), 7 * 24 * 3600)
+        self.assertEqual(self.cache.ttl(SEARCH), 24 * 3600)
+        self.assertEqual(
+            self.cache.ttl('https://eutils.ncbi.nlm.nih.gov/entrez/eutils/'
+                           'efetch.fcgi'),
+            7 * 24 * 3600
+        )
+        self.assertIsNone(self.cache.ttl(UNCACHED))
+
+    def test_uncached_urls_go_to_session(self):
+        for _ in range(2):
+            self.session.responses.append(make_response(UNCACHED))
+            self.cache.get(UNCACHED)
+        self.assertEqual(len(self.session.requests), 2)
+
+    def test_fresh_response_served_from_cache(self):
+        self.session.responses.append(make_response(
+            WORK, body=b'{"a": 1}',
+            headers={'Content-Type': 'application/json; charset=utf-8',
+                     'Content-Length': '8'}
+        ))
+        self.assertEqual(self.cache.get(WORK).json(), {'a': 1})
+        response = self.cache.get(WORK)
+        self.assertEqual(len(self.session.requests), 1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'a': 1})
+        self.assertEqual(response.headers['content-type'],
+                         'application/json; charset=utf-8')
+        self.assertNotIn('content-length', response.headers)
+
+    def test_errors_not_stored(self):
+        self.session.responses += [
+            make_response(WORK, status=500),
+            make_response(WORK, body=b'{"a": 1}'),
+        ]
+        self.assertEqual(self.cache.get(WORK).status_code, 500)
+        self.assertEqual(self.cache.get(WORK).status_code, 200)
+        self.assertEqual(len(self.session.requests), 2)
+
+    def test_stale_response_revalidated(self):
+        self.session.responses.append(make_response(
+            WORK, body=b'{"a": 1}',
+            headers={'ETag': '"v1"',
+                     'Last-Modified': 'Mon, 19 Oct 2026 10:00:00 GMT'}
+        ))
+        self.cache.get(WORK)
+        self.age(7 * 24 * 3600 + 1)
+
+        self.session.responses.append(make_response(WORK, status=304))
+        response = self.cache.get(WORK)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'a': 1})
+        headers = self.session.requests[-1][4]
+        self.assertEqual(headers['If-None-Match'], '"v1"')
+        self.assertEqual(headers['If-Modified-Since'],
+                         'Mon, 19 Oct 2026 10:00:00 GMT')
+
+        # The 304 makes the stored response fresh again
+        self.cache.get(WORK)
+        self.assertEqual(len(self.session.requests), 2)
+
+    def test_changed_response_replaces_stored_one(self):
+        self.session.responses.append(make_response(
+            WORK, body=b'{"a": 1}', headers={'ETag': '"v1"'}
+        ))
+        self.cache.get(WORK)
+        self.age(7 * 24 * 3600 + 1)
+        self.session.responses.append(make_response(
+            WORK, body=b'{"a": 2}', headers={'ETag': '"v2"'}
+        ))
+        self.assertEqual(self.cache.get(WORK).json(), {'a': 2})
+        self.assertEqual(self.cache.get(WORK).json(), {'a': 2})
+        self.assertEqual(len(self.session.requests), 2)
+
+    def test_least_recently_used_dropped_when_full(self):
+        self.cache.max_size = 250
+        for n in range(3):
+            url = '%s/10.1000/%d' % (SEARCH, n)
+            self.session.responses.append(make_response(url, body=b'x' * 100))
+            self.cache.get(url)
+        urls = [url for url, in self.cache._conn.execute(
+            'SELECT url FROM responses ORDER BY used'
+        )]
+        self.assertEqual(urls, [SEARCH + '/10.1000/1', SEARCH + '/10.1000/2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
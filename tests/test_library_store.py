@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from jamciter import CitekeyIndex, FuzzyIndex, LibraryStore, load_bibfile
+
+
+FIRST = u"""
+@article{Smith2020,
+  author = {Smith, John and Doe, Jane},
+  title = {Trigram indexes for bibliographies},
+  journal = {Journal of Indexing},
+  year = {2020}
+}
+
+@article{zsmith,
+  author = {Smith, Anna},
+  title = {Trigram indexes for bibliographies},
+  year = {2020}
+}
+
+@book{jones,
+  author = {Jones, Bob},
+  title = {Searching large libraries},
+  year = {2019}
+}
+"""
+
+SECOND = u"""
+@article{csmith2,
+  author = {Smith, Carl},
+  title = {Trigram indexes for bibliographies},
+  year = {2020}
+}
+
+@article{bbsmith,
+  author = {Smyth, Bea},
+  title = {Fuzzy citation search},
+  year = {2018}
+}
+
+@misc{Smithy,
+  author = {Smithson, Dan},
+  title = {Searching large libraries},
+  year = {2019}
+}
+"""
+
+ADDED = {
+    'ENTRYTYPE': 'article',
+    'id': 'asmith',
+    'author': 'Smith, Eve',
+    'title': 'Trigram indexes for bibliographies',
+    'year': '2020',
+}
+
+
+class StoreTestCase(unittest.TestCase):
+    """Both bibliographies synced into a fresh store"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.paths = []
+        for name, text in (('first.bib', FIRST), ('second.bib', SECOND)):
+            path = os.path.join(self.tmp, name)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            self.paths.append(path)
+        self.db_path = os.path.join(self.tmp, 'db', 'library.db')
+        self.store = LibraryStore(self.db_path)
+        self.store.sync(self.paths)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmp)
+
+
+class TestBackendsAgree(StoreTestCase):
+    """The SQLite store answers queries exactly as the in-memory indexes do"""
+
+    def setUp(self):
+        StoreTestCase.setUp(self)
+        self.docs = [doc for path in self.paths for doc in load_bibfile(path)]
+
+    def assertAgree(self, citekey_index, fuzzy_index):
+        for search in ('', 's', 'smith', 'SMITH', 'ith', 'jo', 'nothing'):
+            for limit in (None, 1, 2, 3, 10):
+                self.assertEqual(
+                    self.store.complete(self.paths, search, limit),
+                    citekey_index.complete(search, limit),
+                    (search, limit)
+                )
+        for query in ('smith', 'trigram indexes', 'smith 2020',
+                      'searching', 'smyth fuzzy', 'nothing'):
+            for limit in (None, 1, 2, 3):
+                self.assertEqual(
+                    [doc['id'] for doc in
+                     self.store.fuzzy_search(self.paths, query, limit)],
+                    [doc['id'] for doc in
+                     fuzzy_index.search(query, limit)],
+                    (query, limit)
+                )
+
+    def test_agree(self):
+        self.assertAgree(
+            CitekeyIndex(doc['id'] for doc in self.docs),
+            FuzzyIndex(self.docs)
+        )
+
+    def test_agree_after_add(self):
+        self.store.add(self.paths, self.paths[0], ADDED)
+        self.assertAgree(
+            CitekeyIndex(doc['id'] for doc in self.docs).added(ADDED['id']),
+            FuzzyIndex(self.docs).added(ADDED)
+        )
+
+    def test_agree_after_resync(self):
+        # A reparsed file's entries get new rows after the other file's
+        os.utime(self.paths[0], (0, 0))
+        self.assertTrue(self.store.sync(self.paths))
+        self.assertAgree(
+            CitekeyIndex(doc['id'] for doc in self.docs),
+            FuzzyIndex(self.docs)
+        )
+
+
+class TestLibraryStore(StoreTestCase):
+
+    def test_documents_and_citekeys_in_file_order(self):
+        keys = [
+            'Smith2020', 'zsmith', 'jones', 'csmith2', 'bbsmith', 'Smithy'
+        ]
+        self.assertEqual(self.store.citekeys(self.paths), keys)
+        self.assertEqual(
+            [doc['id'] for doc in self.store.documents(self.paths)], keys
+        )
+        self.assertEqual(
+            self.store.citekeys(self.paths[::-1]), keys[3:] + keys[:3]
+        )
+
+    def test_queries_only_see_given_paths(self):
+        self.assertEqual(
+            self.store.complete(self.paths[1:], 'smith'),
+            ['Smithy', 'csmith2', 'bbsmith']
+        )
+        self.assertEqual(self.store.complete(self.paths[1:], 'jo'), [])
+        self.assertEqual(self.store.search(self.paths[:1], 'fuzzy'), [])
+        self.assertEqual(self.store.fuzzy_search(self.paths[:1], 'smyth'),
+                         [])
+
+    def test_complete(self):
+        self.assertEqual(
+            self.store.complete(self.paths, 'smith'),
+            ['Smith2020', 'Smithy', 'zsmith', 'csmith2', 'bbsmith']
+        )
+        self.assertEqual(self.store.complete(self.paths, 'SMITH', 2),
+                         ['Smith2020', 'Smithy'])
+        self.assertEqual(self.store.complete(self.paths, 'smith', 3),
+                         ['Smith2020', 'Smithy', 'zsmith'])
+        self.assertEqual(self.store.complete(self.paths, 'xyz'), [])
+
+    def test_fuzzy_search(self):
+        self.assertEqual(
+            [doc['id'] for doc in
+             self.store.fuzzy_search(self.paths, 'smyth fuzzy')],
+            ['bbsmith']
+        )
+        self.assertEqual(self.store.fuzzy_search(self.paths, ''), [])
+
+    def test_full_text_search(self):
+        self.assertEqual(
+            [doc['id'] for doc in self.store.search(self.paths, 'searching')],
+            ['jones', 'Smithy']
+        )
+        self.assertEqual(
+            [doc['id'] for doc in
+             self.store.search(self.paths, 'journal of indexing')][:1],
+            ['Smith2020']
+        )
+        self.assertEqual(self.store.search(self.paths, 'indexing', 0), [])
+        self.assertEqual(self.store.search(self.paths, '!!'), [])
+
+    def test_sync_only_reparses_changed_files(self):
+        self.assertFalse(self.store.sync(self.paths))
+        with open(self.paths[1], 'w', encoding='utf-8') as f:
+            f.write('@misc{only,\n  title = {Only entry}\n}\n')
+        os.utime(self.paths[1], (1, 1))
+        self.assertTrue(self.store.sync(self.paths))
+        self.assertEqual(
+            self.store.citekeys(self.paths),
+            ['Smith2020', 'zsmith', 'jones', 'only']
+        )
+        self.assertEqual(self.store.complete(self.paths, 'smithy'), [])
+
+    def test_sync_survives_reopening(self):
+        self.store.close()
+        self.store = LibraryStore(self.db_path)
+        self.assertFalse(self.store.sync(self.paths))
+        self.assertEqual(len(self.store.citekeys(self.paths)), 6)
+
+    def test_missing_file_has_no_entries(self):
+        missing = os.path.join(self.tmp, 'missing.bib')
+        self.assertTrue(self.store.sync(self.paths + [missing]))
+        self.assertEqual(self.store.citekeys([missing]), [])
+        self.assertFalse(self.store.sync(self.paths + [missing]))
+
+    def test_prune(self):
+        self.store.prune(self.paths[:1])
+        self.assertEqual(self.store.citekeys(self.paths[1:]), [])
+        self.assertEqual(self.store.mtime(self.paths[1]), None)
+        self.assertEqual(self.store.fuzzy_search(self.paths, 'smyth'), [])
+        self.assertEqual(self.store.search(self.paths, 'fuzzy'), [])
+        self.assertTrue(self.store.sync(self.paths))
+
+    def test_add_returns_library_position(self):
+        self.assertEqual(self.store.add(self.paths, self.paths[0], ADDED), 3)
+        self.assertEqual(self.store.add(self.paths, self.paths[1],
+                                        dict(ADDED, id='last')), 7)
+        self.assertEqual(
+            self.store.citekeys(self.paths),
+            ['Smith2020', 'zsmith', 'jones', 'asmith',
+             'csmith2', 'bbsmith', 'Smithy', 'last']
+        )
+        self.assertEqual(self.store.complete(self.paths, 'asm'), ['asmith'])
+        self.assertIn('asmith', [
+            doc['id'] for doc in self.store.search(self.paths, 'trigram')
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import jamciter
+
+
+class TestParseBibfiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.files = []
+        for n in range(4):
+            path = os.path.join(self.tmp, 'lib%d.bib' % n)
+            with open(path, 'w', encoding='utf-8') as f:
+                for i in range(3):
+                    f.write(
+                        '@article{key%d_%d,\n  title = {Title %d},\n'
+                        '  year = {2020}\n}\n\n' % (n, i, i)
+                    )
+            self.files.append((path, jamciter.file_identity(path)))
+        jamciter.reset_libraries()
+
+    def tearDown(self):
+        jamciter.reset_libraries()
+        shutil.rmtree(self.tmp)
+
+    def test_results_in_configured_order(self):
+        parsed = jamciter.parse_bibfiles(self.files)
+        self.assertEqual(
+            [[doc['id'] for doc in docs] for docs in parsed],
+            [['key%d_%d' % (n, i) for i in range(3)] for n in range(4)]
+        )
+
+    def test_cache_only_changed_on_calling_thread(self):
+        threads = []
+        remember = jamciter.remember_parsed_file
+
+        def record(path, identity, docs):
+            threads.append(threading.current_thread())
+            remember(path, identity, docs)
+
+        jamciter.remember_parsed_file = record
+        try:
+            jamciter.parse_bibfiles(self.files)
+        finally:
+            jamciter.remember_parsed_file = remember
+        self.assertEqual(threads, [threading.current_thread()] * 4)
+        self.assertEqual(set(jamciter._PARSED_FILES), set(self.files))
+
+    def test_parsed_files_are_reused(self):
+        first = jamciter.parse_bibfiles(self.files)
+        loaded = []
+        load = jamciter.load_bibfiles
+
+        def record(paths):
+            loaded.append(paths)
+            return load(paths)
+
+        jamciter.load_bibfiles = record
+        try:
+            second = jamciter.parse_bibfiles(self.files)
+        finally:
+            jamciter.load_bibfiles = load
+        self.assertEqual(loaded, [[]])
+        for a, b in zip(first, second):
+            self.assertIs(a, b)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import sublime
+
+from jamciter import StatusSpinner
+
+
+def run_round():
+    """Run the callbacks queued so far, but not the ones they queue"""
+    callbacks = [callback for callback, _ in sublime.pending]
+    del sublime.pending[:]
+    for callback in callbacks:
+        callback()
+
+
+class TestStatusSpinner(unittest.TestCase):
+
+    def setUp(self):
+        del sublime.pending[:]
+        self.spinner = StatusSpinner('test_spinner', 'Testing')
+        self.view = sublime.active_window().active_view()
+
+    def tearDown(self):
+        self.spinner.stop()
+        del sublime.pending[:]
+
+    def test_ticks_until_stopped(self):
+        self.spinner.start()
+        run_round()
+        self.assertEqual(len(sublime.pending), 1)
+        self.assertTrue(self.view.status['test_spinner'].startswith('Testing'))
+        self.spinner.stop()
+        self.assertNotIn('test_spinner', self.view.status)
+        run_round()
+        self.assertEqual(sublime.pending, [])
+
+    def test_restart_before_tick_leaves_one_chain(self):
+        self.spinner.start()
+        for _ in range(5):
+            self.spinner.stop()
+            self.spinner.start()
+        run_round()
+        self.assertEqual(len(sublime.pending), 1)
+        run_round()
+        self.assertEqual(len(sublime.pending), 1)
+
+    def test_start_while_running_changes_message(self):
+        self.spinner.start()
+        self.spinner.start('Other')
+        run_round()
+        self.assertEqual(len(sublime.pending), 1)
+        self.assertTrue(self.view.status['test_spinner'].startswith('Other'))
+
+
+if __name__ == '__main__':
+    unittest.main()